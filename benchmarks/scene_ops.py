@@ -0,0 +1,416 @@
+"""
+scene_ops.py
+------------
+Scaling benchmarks for scene operations.
+
+Used by:
+- python -m benchmarks.scene_ops [--quick] [--json out.json]
+                                 [--baseline base.json | --no-baseline]
+                                 [--threshold 0.25]
+
+Every benchmark runs on synthetic scenes from 100 to 1M footprint
+cells split into 1 to 10k separate (non-touching) structures:
+
+    auto_merge_new   auto_merge_structures([new]) after adding a cell
+                     next to an existing structure (the BUILD path)
+    auto_merge_all   auto_merge_structures() over the whole scene
+    cell_lookup      get_structure_at_cell, per call
+    snapshot         scene_entries() (full-scene snapshot)
+    restore          replace_scene() from that snapshot
+    history_step     undo + redo of a one-structure MOVE step
+                     (the delta history replaced snapshot / restore)
+    export_binary    export_scene() to a binary snapshot
+    load_binary      load_scene() of that snapshot
+    scene_summary    scene_summary() after an edit; the viewer's
+                     compute_scene_bounds / compute_scene_stats wrap it
+
+Results are written as JSON with the median and best time of every
+(benchmark, cells, structures) point plus the log-log scaling exponent
+of the medians per curve. Best times are compared against a baseline
+report, benchmarks/baseline.json unless --baseline names another, and
+the exit status is 1 if any point is slower than the threshold allows.
+Scene sizes that look slower are measured again (CONFIRM_ROUNDS) first;
+only points slower in every run count.
+Baseline times are scaled by a calibration workload timed with each
+report. The stored baseline is still from one reference machine, so it
+is only held to a 2x threshold (scaling regressions); for 25% checks,
+record a local baseline first (--json my_base.json) and compare against
+that.
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from data import scene_data
+from data.history import History
+
+CELL_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+STRUCTURE_COUNTS = [1, 10, 100, 1_000, 10_000]
+QUICK_CELLS = [100, 1_000, 10_000]
+QUICK_STRUCTURES = [1, 10, 100]
+
+# Differences below this (per timed run) are noise, whatever the ratio
+NOISE_FLOOR_S = 250e-6
+
+# Extra runs of a regressed scene size before it counts
+CONFIRM_ROUNDS = 2
+
+# Allowed slowdown. The stored baseline comes from another machine and
+# time, where even calibrated small I/O-bound points vary up to ~2x: it
+# catches scaling regressions. Record a local baseline for finer checks.
+LOCAL_THRESHOLD = 0.25
+STORED_THRESHOLD = 1.0
+
+LOOKUPS = 10_000
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+# ================== SCENES ==================
+
+def make_scene(cells, structures):
+    """
+    `structures` square-ish footprints of cells // structures cells each,
+    laid out on a grid with a one-cell gap so none of them touch.
+    """
+    per = max(1, cells // structures)
+    side = math.ceil(math.sqrt(per))
+    cols = math.ceil(math.sqrt(structures))
+    pitch = side + 2
+
+    xs, ys = np.meshgrid(np.arange(side), np.arange(side), indexing="ij")
+    block = np.stack([xs.ravel(), ys.ravel()], axis=1)[:per].astype(np.int32)
+    offsets = np.array([((k % cols) * pitch, (k // cols) * pitch) for k in range(structures)],
+                       dtype=np.int32)
+    return [block + offset for offset in offsets], pitch
+
+
+def load(cell_sets):
+    n = len(cell_sets)
+    scene_data.replace_scene(cell_sets, [1.0] * n, [1] * n, active=0)
+
+
+# ================== TIMING ==================
+
+def measure(fn, setup=None, min_reps=5, max_reps=50, budget=1.0):
+    """
+    Run fn repeatedly (setup untimed before each run); return the times.
+
+    The garbage collector is off while timing, as in timeit.
+    """
+    times = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        while len(times) < min_reps or (len(times) < max_reps and time.perf_counter() - start < budget):
+            if setup is not None:
+                setup()
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    finally:
+        if enabled:
+            gc.enable()
+    return times
+
+
+def run_point(cells, structures, tmpdir, min_reps=5):
+    """All benchmarks on one scene size. Returns {bench: (times, ops per run)}."""
+    cell_sets, pitch = make_scene(cells, structures)
+    load(cell_sets)
+    out = {}
+    rng = np.random.default_rng(0)
+    cols = math.ceil(math.sqrt(structures))
+
+    # ---------- read-only ----------
+    extent = max(cols * pitch, 1)
+    probes = [tuple(c) for c in rng.integers(0, extent, (LOOKUPS, 2)).tolist()]
+
+    def lookups():
+        for cell in probes:
+            scene_data.get_structure_at_cell(cell)
+    out["cell_lookup"] = (measure(lookups, min_reps=min_reps), LOOKUPS)
+
+    out["snapshot"] = (measure(scene_data.scene_entries, min_reps=min_reps), 1)
+
+    path = os.path.join(tmpdir, "scene.bin")
+    out["export_binary"] = (measure(lambda: scene_data.export_scene(path), min_reps=min_reps), 1)
+
+    # ---------- summary after an edit ----------
+    flip = [1]
+
+    def nudge():
+        # Moving the first structure back and forth dirties the scene bounds
+        scene_data.move_structure(0, flip[0], 0)
+        flip[0] = -flip[0]
+    out["scene_summary"] = (measure(scene_data.scene_summary, setup=nudge, min_reps=min_reps), 1)
+
+    # ---------- full rewrites ----------
+    entries = scene_data.scene_entries()
+
+    def restore():
+        scene_data.replace_scene([e[1] for e in entries], [e[2] for e in entries],
+                                 [e[3] for e in entries], active=0, sids=[e[0] for e in entries])
+    out["restore"] = (measure(restore, min_reps=min_reps), 1)
+    out["load_binary"] = (measure(lambda: scene_data.load_scene(path), min_reps=min_reps), 1)
+
+    # ---------- history ----------
+    history = History()
+    history.begin("MOVE")
+    scene_data.move_structure(0, 1, 0)
+    history.commit()
+
+    def undo_redo():
+        history.undo()
+        history.redo()
+    out["history_step"] = (measure(undo_redo, min_reps=min_reps), 1)
+    history.close()
+
+    # ---------- merges ----------
+    load(cell_sets)
+    out["auto_merge_all"] = (measure(scene_data.auto_merge_structures, min_reps=min_reps), 1)
+
+    target = [0]
+
+    def add_neighbour():
+        # One cell right of a structure's last cell: touches exactly one structure
+        k = target[0] % len(scene_data.structures)
+        target[0] += 1
+        x, y = scene_data.structure_cells(k).max(axis=0).tolist()
+        scene_data.add_structure({(x + 1, y)}, 1.0, 1)
+    out["auto_merge_new"] = (
+        measure(lambda: scene_data.auto_merge_structures([len(scene_data.structures) - 1]),
+                setup=add_neighbour, min_reps=min_reps),
+        1,
+    )
+    return out
+
+
+def calibrate(reps=7):
+    """
+    Best time of a fixed workload (Python loop + NumPy sort) that stands
+    for the machine's current speed.
+    """
+    data = np.random.default_rng(0).integers(0, 1 << 20, 200_000)
+
+    def work():
+        total = 0
+        for i in range(200_000):
+            total += i & 7
+        np.sort(data)
+    return min(measure(work, min_reps=reps, max_reps=reps))
+
+
+# ================== SUITE ==================
+
+def scaling_exponents(results):
+    """Slope of log(time) vs log(cells) per (bench, structures) curve."""
+    curves = {}
+    for r in results:
+        curves.setdefault((r["bench"], r["structures"]), []).append((r["cells"], r["median_s"]))
+
+    out = []
+    for (bench, structures), points in sorted(curves.items()):
+        points = [(c, t) for c, t in points if t > 0]
+        if len(points) < 2:
+            continue
+        x = np.log([c for c, _ in points])
+        y = np.log([t for _, t in points])
+        out.append({"bench": bench, "structures": structures,
+                    "exponent": float(np.polyfit(x, y, 1)[0])})
+    return out
+
+
+def run_suite(cells_list, structure_list, min_reps=5, log=None):
+    results = []
+    calibration = calibrate()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for structures in structure_list:
+            for cells in cells_list:
+                if structures > cells:
+                    continue
+                t0 = time.perf_counter()
+                for bench, (times, ops) in run_point(cells, structures, tmpdir, min_reps).items():
+                    results.append({
+                        "bench": bench,
+                        "cells": cells,
+                        "structures": structures,
+                        "runs": len(times),
+                        "ops": ops,
+                        "median_s": float(np.median(times)) / ops,
+                        "min_s": float(np.min(times)) / ops,
+                    })
+                if log is not None:
+                    log(f"  {cells:>9} cells {structures:>6} structures  "
+                        f"({time.perf_counter() - t0:.1f}s)")
+
+    scene_data.replace_scene([], [], [])
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            # Fastest of the calibration runs before and after the suite
+            "calibration_s": min(calibration, calibrate()),
+        },
+        "results": results,
+        "scaling": scaling_exponents(results),
+    }
+
+
+def speed_ratio(report, baseline):
+    """This machine's calibration time over the baseline's (1.0 if unknown)."""
+    now = report["meta"].get("calibration_s")
+    then = baseline["meta"].get("calibration_s")
+    return now / then if now and then else 1.0
+
+
+def compare(report, baseline, threshold):
+    """
+    Points slower than baseline * (1 + threshold).
+
+    The best run of each point is compared: on a busy machine it is far
+    more repeatable than the median. Baseline times are scaled by the
+    ratio of the two reports' calibration times, so a slower or faster
+    machine (or a throttled one) is not reported as a change.
+    """
+    scale = speed_ratio(report, baseline)
+    base = {(r["bench"], r["cells"], r["structures"]): r for r in baseline["results"]}
+    regressions = []
+    for r in report["results"]:
+        old = base.get((r["bench"], r["cells"], r["structures"]))
+        if old is None or old["min_s"] <= 0:
+            continue
+        expected = old["min_s"] * scale
+        ratio = r["min_s"] / expected
+        r["baseline_s"] = expected
+        r["ratio"] = ratio
+        # The floor applies to a whole timed run, not to one of its ops
+        if ratio > 1 + threshold and (r["min_s"] - expected) * r.get("ops", 1) > NOISE_FLOOR_S:
+            regressions.append(r)
+    return regressions
+
+
+def confirm(report, baseline, threshold, regressions, rounds=CONFIRM_ROUNDS, min_reps=5,
+            log=None):
+    """
+    Re-measure the scene sizes with regressions, keeping each point's best
+    time across runs, so a noisy run alone doesn't fail the comparison.
+    Returns the regressions left.
+    """
+    by_key = {(r["bench"], r["cells"], r["structures"]): r for r in report["results"]}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for _ in range(rounds):
+            if not regressions:
+                break
+            for cells, structures in sorted({(r["cells"], r["structures"]) for r in regressions}):
+                if log is not None:
+                    log(f"  re-measuring {cells} cells {structures} structures")
+                for bench, (times, ops) in run_point(cells, structures, tmpdir, min_reps).items():
+                    r = by_key[(bench, cells, structures)]
+                    r["min_s"] = min(r["min_s"], float(np.min(times)) / ops)
+            regressions = compare(report, baseline, threshold)
+    scene_data.replace_scene([], [], [])
+    return regressions
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g}{unit}"
+    return f"{seconds / 1e-9:.3g}ns"
+
+
+def print_table(report, out=sys.stdout):
+    """One scaling table per benchmark: rows = structures, columns = cells."""
+    results = report["results"]
+    cells_list = sorted({r["cells"] for r in results})
+    by_key = {(r["bench"], r["cells"], r["structures"]): r for r in results}
+    exponents = {(e["bench"], e["structures"]): e["exponent"] for e in report["scaling"]}
+
+    for bench in dict.fromkeys(r["bench"] for r in results):
+        print(f"\n{bench}", file=out)
+        print("  structures " + "".join(f"{c:>12}" for c in cells_list) + "   slope", file=out)
+        for structures in sorted({r["structures"] for r in results}):
+            row = []
+            for cells in cells_list:
+                r = by_key.get((bench, cells, structures))
+                if r is None:
+                    row.append(f"{'-':>12}")
+                    continue
+                mark = ""
+                if "ratio" in r:
+                    mark = f" {r['ratio']:.2f}x"
+                row.append(f"{format_time(r['median_s']) + mark:>12}")
+            slope = exponents.get((bench, structures))
+            slope = f"{slope:8.2f}" if slope is not None else ""
+            print(f"  {structures:>10} " + "".join(row) + slope, file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scene operation scaling benchmarks.")
+    parser.add_argument("--quick", action="store_true", help="small sizes only (<= 10k cells)")
+    parser.add_argument("--max-cells", type=int, help="skip scene sizes above this")
+    parser.add_argument("--reps", type=int, default=5, help="minimum runs per point")
+    parser.add_argument("--json", help="write the report to this path")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="compare against a previous --json report (default: %(default)s)")
+    parser.add_argument("--no-baseline", action="store_true", help="skip the comparison")
+    parser.add_argument("--threshold", type=float,
+                        help="allowed slowdown vs baseline (0.25 = 25%%; default "
+                             f"{LOCAL_THRESHOLD} vs a local baseline, {STORED_THRESHOLD} "
+                             "vs the stored one)")
+    args = parser.parse_args(argv)
+
+    cells_list = QUICK_CELLS if args.quick else CELL_SIZES
+    structure_list = QUICK_STRUCTURES if args.quick else STRUCTURE_COUNTS
+    if args.max_cells:
+        cells_list = [c for c in cells_list if c <= args.max_cells]
+
+    report = run_suite(cells_list, structure_list, args.reps,
+                       log=lambda msg: print(msg, file=sys.stderr))
+
+    if args.threshold is None:
+        stored = os.path.abspath(args.baseline) == BASELINE_FILE
+        args.threshold = STORED_THRESHOLD if stored else LOCAL_THRESHOLD
+
+    regressions = []
+    if args.baseline and not args.no_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"machine speed vs baseline: {1 / speed_ratio(report, baseline):.2f}x "
+              f"(baseline times scaled to match)", file=sys.stderr)
+        regressions = compare(report, baseline, args.threshold)
+        regressions = confirm(report, baseline, args.threshold, regressions,
+                              min_reps=args.reps, log=lambda msg: print(msg, file=sys.stderr))
+        report["regressions"] = len(regressions)
+
+    print_table(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"  {r['bench']} cells={r['cells']} structures={r['structures']}: "
+                  f"{format_time(r['baseline_s'])} -> {format_time(r['min_s'])} "
+                  f"({r['ratio']:.2f}x)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
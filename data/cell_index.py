@@ -0,0 +1,143 @@
+"""
+cell_index.py
+-------------
+Cell -> structure id lookup for AirBlocks scenes.
+
+Used by:
+- data/scene_data.py (hit testing, merge neighbour lookup)
+
+Owners are kept in chunked int32 tiles (same layout as voxel_store),
+so a lookup is one dict probe plus one array read, and bulk updates
+write each touched tile once.
+Structure ids are stable ids, not list positions.
+"""
+
+import numpy as np
+
+from data.voxel_store import (
+    CHUNK_SHIFT,
+    CHUNK_SIZE,
+    CHUNK_MASK,
+    as_cell_array,
+    chunk_rows,
+    group_by_chunk,
+)
+
+NO_OWNER = -1
+
+
+class CellIndex:
+    """
+    Hash index from grid cell to owning structure id.
+
+    Tiles store sid + 1 (0 means empty). Cells claimed by more than one
+    structure (e.g. after a fist move onto another structure) keep the
+    extra owners in a small overflow dict.
+    """
+
+    def __init__(self):
+        self._chunks = {}
+        self._extra = {}     # (x, y) -> [sid, ...] beyond the tile owner
+
+    def clear(self):
+        self._chunks.clear()
+        self._extra.clear()
+
+    def __len__(self):
+        return sum(int(np.count_nonzero(t)) for t in self._chunks.values())
+
+    # ================== UPDATES ==================
+
+    def add(self, cells, sid):
+        """Register cells as owned by sid."""
+        arr = as_cell_array(cells)
+        tag = sid + 1
+
+        for key, lx, ly in group_by_chunk(arr):
+            tile = self._chunks.get(key)
+            if tile is None:
+                tile = self._chunks[key] = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=np.int32)
+
+            current = tile[lx, ly]
+            free = current == 0
+            tile[lx[free], ly[free]] = tag
+
+            taken = ~free & (current != tag)
+            if taken.any():
+                bx, by = key[0] << CHUNK_SHIFT, key[1] << CHUNK_SHIFT
+                for x, y in zip(lx[taken].tolist(), ly[taken].tolist()):
+                    self._extra.setdefault((bx + x, by + y), []).append(sid)
+
+    def remove(self, cells, sid):
+        """Drop sid's ownership of cells (other owners are kept)."""
+        arr = as_cell_array(cells)
+        tag = sid + 1
+
+        for key, lx, ly in group_by_chunk(arr):
+            tile = self._chunks.get(key)
+            if tile is None:
+                continue
+
+            mine = tile[lx, ly] == tag
+            tile[lx[mine], ly[mine]] = 0
+
+            if self._extra:
+                bx, by = key[0] << CHUNK_SHIFT, key[1] << CHUNK_SHIFT
+                for x, y, owned in zip(lx.tolist(), ly.tolist(), mine.tolist()):
+                    cell = (bx + x, by + y)
+                    extra = self._extra.get(cell)
+                    if extra is None:
+                        continue
+                    if owned:
+                        # Promote the next overlapping owner into the tile
+                        tile[x, y] = extra.pop(0) + 1
+                    elif sid in extra:
+                        extra.remove(sid)
+                    if not extra:
+                        del self._extra[cell]
+
+            if not tile.any():
+                del self._chunks[key]
+
+    # ================== QUERIES ==================
+
+    def owner(self, cell):
+        """Return the primary owner sid of a cell, or None."""
+        x, y = cell
+        tile = self._chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if tile is None:
+            return None
+        tag = int(tile[x & CHUNK_MASK, y & CHUNK_MASK])
+        return tag - 1 if tag else None
+
+    def owners(self, cell):
+        """Return every sid owning a cell (usually zero or one)."""
+        sid = self.owner(cell)
+        if sid is None:
+            return []
+        return [sid] + self._extra.get(tuple(cell), [])
+
+    def owner_ids(self, cells):
+        """Set of every sid owning at least one of cells."""
+        arr = as_cell_array(cells)
+        found = set(np.unique(self.lookup(arr)).tolist())
+        found.discard(NO_OWNER)
+        if self._extra:
+            for cell in map(tuple, arr.tolist()):
+                found.update(self._extra.get(cell, ()))
+        return found
+
+    def lookup(self, cells):
+        """Vectorized primary owner per cell (NO_OWNER when empty)."""
+        arr = as_cell_array(cells)
+        out = np.full(len(arr), NO_OWNER, dtype=np.int64)
+        if len(arr) == 0 or not self._chunks:
+            return out
+
+        lx = arr[:, 0] & CHUNK_MASK
+        ly = arr[:, 1] & CHUNK_MASK
+        for key, rows in chunk_rows(arr):
+            tile = self._chunks.get(key)
+            if tile is not None:
+                out[rows] = tile[lx[rows], ly[rows]] - 1
+        return out
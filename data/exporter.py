@@ -0,0 +1,202 @@
+"""
+exporter.py
+-----------
+Scene snapshot file formats for AirBlocks.
+
+Used by:
+- data/scene_data.py (export_scene / load_scene)
+- Phase 7.x Viewer (memory-mapped loading)
+
+Binary layout (little-endian, version 2):
+
+    header   : magic "ABSC", version u16, flags u16,
+               structure count u32, active sid i32,
+               session u32, seq u64   (v2+, see data/journal.py)
+    table    : per structure -> sid i32, cell count u32,
+               scale f32, height i32, data offset u64
+    data     : per structure -> (N, 2) int32 cells sorted by (x, y);
+               with FLAG_DELTA every row after the first stores the
+               difference from the previous row
+
+The legacy JSON layout (list of {"blocks", "scale", "height"})
+is still readable and writable.
+"""
+
+import json
+import mmap
+import struct
+
+import numpy as np
+
+# ================== BINARY LAYOUT ==================
+
+MAGIC = b"ABSC"
+VERSION = 2
+
+FLAG_DELTA = 1
+
+HEADER_V1 = struct.Struct("<4sHHIi")
+HEADER = struct.Struct("<4sHHIiIQ")
+ENTRY = struct.Struct("<iIfiQ")
+
+NO_ACTIVE = -1
+
+
+class SceneFormatError(ValueError):
+    pass
+
+
+def _sorted_cells(cells):
+    cells = np.asarray(cells, dtype=np.int32).reshape(-1, 2)
+    if len(cells) < 2:
+        return cells
+    return cells[np.lexsort((cells[:, 1], cells[:, 0]))]
+
+
+def _delta_encode(cells):
+    out = cells.copy()
+    out[1:] -= cells[:-1]
+    return out
+
+
+def _delta_decode(data):
+    return np.cumsum(data, axis=0, dtype=np.int32)
+
+
+# ================== BINARY WRITE ==================
+
+def write_scene(f, entries, active_sid=None, delta=True, session=0, seq=0):
+    """
+    Write a binary snapshot to an open binary file object.
+
+    entries: iterable of (sid, cells, scale, height), cells as (N, 2).
+    session / seq tag the snapshot as a journal checkpoint.
+    """
+    entries = [(sid, _sorted_cells(cells), scale, height)
+               for sid, cells, scale, height in entries]
+
+    flags = FLAG_DELTA if delta else 0
+    active = NO_ACTIVE if active_sid is None else active_sid
+    f.write(HEADER.pack(MAGIC, VERSION, flags, len(entries), active, session, seq))
+
+    offset = HEADER.size + ENTRY.size * len(entries)
+    for sid, cells, scale, height in entries:
+        f.write(ENTRY.pack(sid, len(cells), scale, height, offset))
+        offset += cells.nbytes
+
+    for _, cells, _, _ in entries:
+        data = _delta_encode(cells) if delta else cells
+        f.write(np.ascontiguousarray(data, dtype="<i4").tobytes())
+
+
+# ================== BINARY READ ==================
+
+class MappedScene:
+    """
+    Read-only view over a binary snapshot.
+
+    Cell data is exposed as NumPy views straight into the buffer
+    (a memory map when opened from a path), so nothing is copied until
+    cells() decodes a delta-encoded structure.
+    """
+
+    def __init__(self, buffer, owner=None):
+        self._buffer = buffer
+        self._owner = owner
+
+        if len(buffer) < HEADER_V1.size:
+            raise SceneFormatError("truncated header")
+        magic, version, flags, count, active = HEADER_V1.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise SceneFormatError("not an AirBlocks binary scene")
+        if version > VERSION:
+            raise SceneFormatError(f"unsupported scene version {version}")
+
+        if version >= 2:
+            header = HEADER
+            *_, self.session, self.seq = HEADER.unpack_from(buffer, 0)
+        else:
+            header = HEADER_V1
+            self.session, self.seq = 0, 0
+
+        self.version = version
+        self.delta = bool(flags & FLAG_DELTA)
+        self.active_sid = None if active == NO_ACTIVE else active
+
+        self.sids = []
+        self.scales = []
+        self.heights = []
+        self._data = []
+        for i in range(count):
+            sid, n, scale, height, offset = ENTRY.unpack_from(buffer, header.size + i * ENTRY.size)
+            self.sids.append(sid)
+            self.scales.append(scale)
+            self.heights.append(height)
+            self._data.append(
+                np.frombuffer(buffer, dtype="<i4", count=n * 2, offset=offset).reshape(n, 2)
+            )
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mm, owner=mm)
+
+    def __len__(self):
+        return len(self.sids)
+
+    def raw(self, i):
+        """Stored (N, 2) int32 data for structure i (zero-copy view)."""
+        return self._data[i]
+
+    def cells(self, i):
+        """Absolute (N, 2) int32 cells for structure i."""
+        data = self._data[i]
+        return _delta_decode(data) if self.delta and len(data) else data
+
+    def close(self):
+        self._data = []
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_binary_scene(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+# ================== JSON ==================
+
+def write_scene_json(f, entries):
+    """Write the legacy JSON layout to an open text file object."""
+    json.dump([
+        {"blocks": np.asarray(cells).tolist(), "scale": scale, "height": height}
+        for _, cells, scale, height in entries
+    ], f)
+
+
+def read_scene_json(f):
+    """
+    Return (cells list, scales, heights) from the legacy JSON layout.
+
+    Raises SceneFormatError for invalid JSON or malformed entries.
+    """
+    data = json.load(f)
+    try:
+        return (
+            [np.array(s["blocks"], dtype=np.int32).reshape(-1, 2) for s in data],
+            [float(s.get("scale", 1.0)) for s in data],
+            [int(s.get("height", 1)) for s in data],
+        )
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise SceneFormatError(f"malformed JSON scene entry: {e!r}")
@@ -0,0 +1,141 @@
+"""
+history.py
+----------
+Delta-based undo / redo for AirBlocks scenes.
+
+Used by:
+- Phase 6.x Editor (BUILD / MOVE / EXTRUDE commits, Ctrl+Z / Ctrl+Y)
+
+Instead of copying the whole scene per step, a step stores the
+primitive operations scene_data applied while it was open
+(cells added or removed, move offsets, height / scale changes,
+merges). Undo applies their inverses in reverse order, so it costs
+time proportional to the step, not the scene.
+
+Only edits made between begin() and commit() are recorded.
+"""
+
+from collections import deque
+
+from data import scene_data
+
+# Default memory budget for undo + redo steps
+DEFAULT_BUDGET_BYTES = 32 * 1024 * 1024
+
+
+class Step:
+    """One undoable user action (a list of primitive operations)."""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.ops = []
+        self.nbytes = 0
+
+    def add(self, op):
+        last = self.ops[-1] if self.ops else None
+
+        # Coalesce per-frame drags into one delta
+        if last is not None and last["op"] == op["op"] and last.get("sid") == op.get("sid"):
+            if op["op"] == "move":
+                self.ops[-1] = dict(last, dx=last["dx"] + op["dx"], dy=last["dy"] + op["dy"])
+                return
+            if op["op"] in ("height", "scale", "active"):
+                self.ops[-1] = dict(last, new=op["new"])
+                return
+
+        self.ops.append(op)
+        self.nbytes += scene_data.op_nbytes(op)
+
+
+class History:
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.nbytes = 0
+        self._open = None
+        self._replaying = False
+        scene_data.add_listener(self._record)
+
+    def close(self):
+        scene_data.remove_listener(self._record)
+
+    # ================== RECORDING ==================
+
+    def begin(self, label=None):
+        """Start collecting operations into one undo step."""
+        if self._open is None:
+            self._open = Step(label)
+
+    def commit(self):
+        """Close the open step. Empty steps are dropped."""
+        step, self._open = self._open, None
+        if step is None or not step.ops:
+            return False
+
+        self.nbytes -= sum(s.nbytes for s in self.redo_stack)
+        self.redo_stack.clear()
+        self.undo_stack.append(step)
+        self.nbytes += step.nbytes
+        self._trim()
+        return True
+
+    def _record(self, op):
+        if self._replaying:
+            return
+        if op["op"] == "reset":
+            self.clear()
+        elif op["op"] in scene_data.MARKER_OPS:
+            return
+        elif self._open is not None:
+            self._open.add(op)
+
+    def _trim(self):
+        # Keep at least the newest step, even if it alone exceeds the budget
+        while self.nbytes > self.budget_bytes and len(self.undo_stack) > 1:
+            self.nbytes -= self.undo_stack.popleft().nbytes
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._open = None
+        self.nbytes = 0
+
+    # ================== UNDO / REDO ==================
+
+    def can_undo(self):
+        return bool(self.undo_stack) or bool(self._open and self._open.ops)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        """Revert the newest step. Returns its label, or None."""
+        self.commit()
+        if not self.undo_stack:
+            return None
+
+        step = self.undo_stack.pop()
+        scene_data.notify({"op": "undo", "label": step.label})
+        self._replay(scene_data.invert_op(op) for op in reversed(step.ops))
+        self.redo_stack.append(step)
+        return step.label
+
+    def redo(self):
+        """Re-apply the newest undone step. Returns its label, or None."""
+        if not self.redo_stack:
+            return None
+
+        step = self.redo_stack.pop()
+        scene_data.notify({"op": "redo", "label": step.label})
+        self._replay(step.ops)
+        self.undo_stack.append(step)
+        return step.label
+
+    def _replay(self, ops):
+        self._replaying = True
+        try:
+            for op in ops:
+                scene_data.apply_op(op)
+        finally:
+            self._replaying = False
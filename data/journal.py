@@ -0,0 +1,375 @@
+"""
+journal.py
+----------
+Append-only change journal between the editor and the viewer.
+
+Used by:
+- Phase 6.x Editor (JournalWriter)
+- Phase 7.x Viewer (JournalReader)
+
+The editor appends every scene operation (see scene_data.apply_op) with
+a sequence number. Every so often the journal is compacted: the full
+scene is written as a binary checkpoint tagged with (session, seq) and
+the journal restarts after that seq. Compaction checkpoints are written
+by a background SceneWriter (data/scene_writer.py); the journal keeps
+growing until the snapshot is on disk and is then rewritten with only
+the records after it. A reader may therefore find a checkpoint newer
+than the journal's base seq; it then skips the records up to it.
+
+The viewer keeps its own copy of the scene and tails the journal from
+the last seq it applied, so a sync costs the size of the edit rather
+than the size of the scene.
+
+Journal layout (little-endian):
+
+    header : magic "ABJL", version u16, session u32, base seq u64
+    record : payload length u32, seq u64, payload
+
+A payload is a JSON description of the operation followed by the raw
+int32 bytes of any cell arrays it carries.
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from data import scene_data
+from data.scene_writer import SceneWriter
+
+JOURNAL_FILE = os.path.join("data", "scene_journal.log")
+
+MAGIC = b"ABJL"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHIQ")
+RECORD = struct.Struct("<IQ")
+META_LEN = struct.Struct("<I")
+
+# Compaction policy
+CHECKPOINT_EVERY_OPS = 1000
+CHECKPOINT_EVERY_BYTES = 4 * 1024 * 1024
+
+
+# ================== OPERATION CODEC ==================
+
+def encode_op(op):
+    """Serialize a scene operation to bytes."""
+    arrays = []
+
+    def pack(value):
+        if isinstance(value, np.ndarray):
+            arrays.append(np.ascontiguousarray(value, dtype="<i4"))
+            return {"__cells__": len(value)}
+        if isinstance(value, dict):
+            return {k: pack(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [pack(v) for v in value]
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    meta = json.dumps(pack(op), separators=(",", ":")).encode()
+    return META_LEN.pack(len(meta)) + meta + b"".join(a.tobytes() for a in arrays)
+
+
+def decode_op(payload):
+    """Inverse of encode_op. Cell arrays come back read-only."""
+    (meta_len,) = META_LEN.unpack_from(payload, 0)
+    meta = json.loads(bytes(payload[META_LEN.size:META_LEN.size + meta_len]))
+    offset = META_LEN.size + meta_len
+
+    # Arrays were written in traversal order, so read them back the same way
+    def unpack(value):
+        nonlocal offset
+        if isinstance(value, dict):
+            if "__cells__" in value:
+                n = value["__cells__"]
+                arr = np.frombuffer(payload, dtype="<i4", count=n * 2, offset=offset).reshape(n, 2)
+                offset += n * 8
+                return arr
+            return {k: unpack(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [unpack(v) for v in value]
+        return value
+
+    return unpack(meta)
+
+
+def _new_session():
+    return int.from_bytes(os.urandom(4), "little")
+
+
+# ================== WRITER (EDITOR) ==================
+
+class JournalWriter:
+    """
+    Listens to scene_data and appends every operation to the journal.
+
+    checkpoint_path is the binary snapshot the viewer loads first
+    (scene_data.SCENE_FILE by default). With a tracer (FrameTracer) every
+    checkpoint is timed as the "checkpoint" stage.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, checkpoint_path=None,
+                 every_ops=CHECKPOINT_EVERY_OPS, every_bytes=CHECKPOINT_EVERY_BYTES,
+                 tracer=None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path or scene_data.SCENE_FILE
+        self.every_ops = every_ops
+        self.every_bytes = every_bytes
+
+        self.session = _new_session()
+        self.seq = 0
+        self.base_seq = 0
+        self.ops_since_checkpoint = 0
+        self.bytes_since_checkpoint = 0
+        self.mirror = None
+        self.tracer = tracer
+        self.writer = SceneWriter()
+        self._file = None
+        self._records = []      # (seq, record bytes) in the current journal
+        self._rotated_for = None
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.checkpoint()
+        scene_data.add_listener(self._on_op)
+
+    def attach_mirror(self, publisher):
+        """
+        Also publish every record to a shared-memory ring (ShmPublisher).
+
+        The file is then only flushed on flush() / checkpoints, keeping
+        disk writes off the per-frame path.
+        """
+        publisher.reset(self.session, self.seq)
+        self.mirror = publisher
+
+    def close(self):
+        scene_data.remove_listener(self._on_op)
+        self.writer.close()
+        self._rotate_to_written()
+        if self.mirror is not None:
+            self.mirror.close()
+            self.mirror = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _on_op(self, op):
+        if op["op"] == "reset":
+            # The reset takes a seq of its own, so readers already at the
+            # old seq see the journal move past them and reload the checkpoint
+            self.seq += 1
+            self.checkpoint()
+            if self.mirror is not None:
+                self.mirror.reset(self.session, self.seq)
+            return
+
+        self.seq += 1
+        payload = encode_op(op)
+        record = RECORD.pack(len(payload), self.seq) + payload
+        self._file.write(record)
+        self._records.append((self.seq, record))
+        if self.mirror is None or not self.mirror.publish(self.seq, payload):
+            self._file.flush()
+        self.ops_since_checkpoint += 1
+        self.bytes_since_checkpoint += len(record)
+
+        self._rotate_to_written()
+        if (self.ops_since_checkpoint >= self.every_ops
+                or self.bytes_since_checkpoint >= self.every_bytes):
+            self.checkpoint(wait=False)
+
+    def flush(self):
+        self._rotate_to_written()
+        if self._file is not None:
+            self._file.flush()
+
+    def checkpoint(self, wait=True):
+        """
+        Write the full scene tagged with the current seq and restart the journal.
+
+        With wait=False the snapshot is handed to the background writer and
+        the journal is restarted later, once it is on disk (see flush()).
+
+        wait=True (startup and scene resets) still serializes the scene on
+        the calling thread, after any queued write has landed: a reset has
+        no journal record, so its snapshot must be on disk before the
+        journal moves past the readers. Edits, undo and redo only ever
+        reach the background writer.
+        """
+        if self.tracer is None:
+            return self._checkpoint(wait)
+        with self.tracer.span("checkpoint"):
+            return self._checkpoint(wait)
+
+    def _checkpoint(self, wait):
+        version = scene_data.scene_version()
+        if not wait:
+            self.ops_since_checkpoint = 0
+            self.bytes_since_checkpoint = 0
+            self.writer.submit(self.checkpoint_path, version, self.seq,
+                               "binary", self.session, self.seq)
+            return
+
+        # Let a queued write land first so it cannot overwrite this one
+        self.writer.flush()
+        try:
+            scene_data.write_scene_file(self.checkpoint_path, *version, "binary",
+                                        self.session, self.seq)
+        except PermissionError:
+            # Snapshot still locked: keep the journal (no checkpoint covers a
+            # restart) and retry on the next operation
+            self.ops_since_checkpoint = self.every_ops
+            if self._file is None:
+                # No journal yet: start one; readers wait for a matching checkpoint
+                self._restart(self.seq)
+            return
+        self.ops_since_checkpoint = 0
+        self.bytes_since_checkpoint = 0
+        self._restart(self.seq)
+
+    def _rotate_to_written(self):
+        """Restart the journal after the newest checkpoint the writer finished."""
+        written = self.writer.written
+        if written is not None and written > self.base_seq and written != self._rotated_for:
+            self._rotated_for = written
+            self._restart(written)
+
+    def _restart(self, base_seq):
+        """Replace the journal with one starting after base_seq (later records kept)."""
+        self._records = [(seq, record) for seq, record in self._records if seq > base_seq]
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.session, base_seq))
+            for _, record in self._records:
+                f.write(record)
+
+        if self._file is not None:
+            self._file.close()
+        try:
+            os.replace(tmp, self.path)
+        except PermissionError:
+            # Reader has the old journal open (Windows); keep appending to it
+            self._file = open(self.path, "ab")
+            return
+
+        self._file = open(self.path, "ab")
+        self.base_seq = base_seq
+
+
+# ================== READER (VIEWER) ==================
+
+class JournalReader:
+    """
+    Tails the journal and patches scene_data in place.
+
+    poll() returns the number of changes applied (0 when idle).
+    A full checkpoint load counts as one change.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, checkpoint_path=None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path or scene_data.SCENE_FILE
+        self.session = None
+        self.seq = -1
+        self.base_seq = None
+        self.reloads = 0        # full checkpoint loads
+        self._offset = HEADER.size
+        self._stat = None
+
+    def available(self):
+        return os.path.exists(self.path)
+
+    def poll(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return 0
+
+        stat_key = (st.st_size, st.st_mtime_ns)
+        if stat_key == self._stat:
+            return 0
+
+        # Set first: _read() clears it to retry on the next poll
+        self._stat = stat_key
+        try:
+            with open(self.path, "rb") as f:
+                return self._read(f)
+        except OSError:
+            self._stat = None
+            return 0
+
+    def _read(self, f):
+        head = f.read(HEADER.size)
+        if len(head) < HEADER.size:
+            return 0
+        magic, _, session, base_seq = HEADER.unpack(head)
+        if magic != MAGIC:
+            return 0
+
+        changes = 0
+        if session != self.session or base_seq > self.seq:
+            # New editor session or compacted past us: start from the checkpoint.
+            # It may be newer than the journal's base (written in the background,
+            # journal not restarted yet); records it already holds are skipped.
+            try:
+                tag = scene_data.load_binary_scene(self.checkpoint_path)
+            except ValueError:
+                # Truncated / corrupt checkpoint (SceneFormatError): retry next poll
+                self._stat = None
+                return 0
+            if tag[0] != session or tag[1] < base_seq:
+                self._stat = None
+                return 0
+            self.session, self.seq = tag
+            self.base_seq = base_seq
+            self.reloads += 1
+            self._offset = HEADER.size
+            changes += 1
+        elif base_seq != self.base_seq:
+            # Compacted, but we already hold everything up to self.seq
+            self.base_seq = base_seq
+            self._offset = HEADER.size
+
+        f.seek(self._offset)
+        data = f.read()
+        pos = 0
+        while pos + RECORD.size <= len(data):
+            length, seq = RECORD.unpack_from(data, pos)
+            end = pos + RECORD.size + length
+            if end > len(data):
+                break   # record still being written
+
+            applied = self.apply_record(seq, memoryview(data)[pos + RECORD.size:end])
+            if applied is None:
+                break
+            changes += applied
+            pos = end
+
+        self._offset += pos
+        return changes
+
+    def apply_record(self, seq, payload):
+        """
+        Apply one record if it is the next in sequence.
+
+        Returns 1 if the scene changed, 0 if skipped, None on a gap
+        (the reader then resyncs from the next checkpoint).
+        """
+        if seq <= self.seq:
+            return 0
+        if seq > self.seq + 1:
+            self.session = None
+            self._stat = None
+            return None
+
+        op = decode_op(payload)
+        self.seq = seq
+        if op["op"] in scene_data.MARKER_OPS:
+            return 0
+        scene_data.apply_op(op)
+        return 1
@@ -1,78 +1,666 @@
-import json
 import os
+import time
+from collections import Counter
 
-structures = []
+import numpy as np
+
+from data import exporter
+from data.voxel_store import ChunkedCellSet, EMPTY_CELLS, as_cell_array
+from data.cell_index import CellIndex
+from data.union_find import DisjointSet
+
+structures = []          # list[ChunkedCellSet]
 structure_scales = []
 structure_heights = []   # ✅ NEW (Phase B)
-active_structure_index = None
+structure_ids = []       # stable id per structure (list position -> sid)
+_active_sid = None
+
+# Cell -> sid index plus sid -> list position, kept in sync by every mutation
+cell_index = CellIndex()
+_positions = {}
+_next_sid = 0
+
+# Called with every applied scene operation (undo history, journal, ...)
+_listeners = []
+
+# sid -> geometry version, bumped whenever a structure's cells, height
+# or scale change (lets the viewer rebuild only what changed)
+structure_versions = {}
+_version_clock = 0
+
+# Aggregates kept up to date by every operation (see AGGREGATES below)
+structure_bounds = {}         # sid -> (min_x, min_y, max_x, max_y) or None
+_blocks = {}                  # sid -> footprint cells * height
+_total_blocks = 0
+_height_counts = Counter()    # heights of non-empty structures
+_height_of = {}               # sid -> height counted in _height_counts
+_scene_bounds = None
+_scene_bounds_dirty = False
 
-SCENE_FILE = os.path.join("data", "scene_snapshot.json")
+# Informational operations that change nothing (undo / redo markers)
+MARKER_OPS = {"undo", "redo"}
+
+SCENE_FILE = os.path.join("data", "scene_snapshot.bin")
+SCENE_JSON_FILE = os.path.join("data", "scene_snapshot.json")   # legacy / interchange
+
+# Snapshot os.replace retries while a reader holds the file (Windows)
+REPLACE_RETRIES = 5
+REPLACE_RETRY_DELAY = 0.02    # seconds, doubled per retry
 
 def get_active_index():
-    return active_structure_index
+    return _positions.get(_active_sid)
+
+def _new_sid():
+    global _next_sid
+    sid = _next_sid
+    _next_sid += 1
+    return sid
+
+def _reindex_positions(start=0):
+    """Refresh sid -> position for every structure from start onwards."""
+    for pos in range(start, len(structure_ids)):
+        _positions[structure_ids[pos]] = pos
+
+def _frozen(cells):
+    """Read-only cell array that is safe to keep inside an operation."""
+    arr = as_cell_array(cells)
+    if arr.flags.writeable:
+        arr = arr.copy()
+        arr.flags.writeable = False
+    return arr
+
+# ================== LISTENERS ==================
+
+def add_listener(fn):
+    if fn not in _listeners:
+        _listeners.append(fn)
+
+def remove_listener(fn):
+    if fn in _listeners:
+        _listeners.remove(fn)
+
+def _emit(op):
+    for fn in list(_listeners):
+        fn(op)
+
+def notify(op):
+    """Pass a marker operation (see MARKER_OPS) to listeners."""
+    _emit(op)
+
+# ================== EDIT API ==================
+# Every edit is expressed as one primitive operation (a small dict) and
+# goes through apply_op(), so undo/redo and replay share one code path.
 
 def add_structure(cells, scale=1.0, height=1):
-    structures.append(set(cells))
-    structure_scales.append(scale)
-    structure_heights.append(height)
+    apply_op({
+        "op": "add",
+        "sid": _new_sid(),
+        "pos": len(structures),
+        "cells": _frozen(cells),
+        "scale": scale,
+        "height": height,
+    })
     set_active_structure(len(structures) - 1)
 
 def add_block_to_structure(index, cell):
-    if 0 <= index < len(structures):
-        structures[index].add(cell)
+    if 0 <= index < len(structures) and cell not in structures[index]:
+        apply_op({"op": "add_cells", "sid": structure_ids[index], "cells": _frozen([cell])})
 
 def set_active_structure(index):
-    global active_structure_index
-    if 0 <= index < len(structures):
-        active_structure_index = index
+    if index is not None and 0 <= index < len(structures):
+        sid = structure_ids[index]
+        if sid != _active_sid:
+            apply_op({"op": "active", "old": _active_sid, "new": sid})
 
 def move_structure(index, dx, dy):
-    if 0 <= index < len(structures):
-        structures[index] = {(x + dx, y + dy) for x, y in structures[index]}
+    if 0 <= index < len(structures) and (dx or dy):
+        apply_op({"op": "move", "sid": structure_ids[index], "dx": dx, "dy": dy})
 
 def scale_structure(index, delta):
     if 0 <= index < len(structure_scales):
-        structure_scales[index] = max(0.5, min(2.0, structure_scales[index] + delta))
+        old = structure_scales[index]
+        new = max(0.5, min(2.0, old + delta))
+        if new != old:
+            apply_op({"op": "scale", "sid": structure_ids[index], "old": old, "new": new})
+
+def set_structure_height(index, height):
+    if 0 <= index < len(structure_heights):
+        old = structure_heights[index]
+        if height != old:
+            apply_op({"op": "height", "sid": structure_ids[index], "old": old, "new": height})
+
+def replace_scene(cell_sets, scales, heights, active=None, sids=None):
+    """
+    Swap in a whole new structure list and rebuild the cell index.
+
+    Used for full restores (scene loads). Stored sids are kept when
+    given. Listeners get a "reset" operation since earlier operations
+    no longer apply.
+    """
+    global _active_sid, _next_sid
+
+    structures[:] = [ChunkedCellSet(c) if not isinstance(c, ChunkedCellSet) else c
+                     for c in cell_sets]
+    structure_scales[:] = scales
+    structure_heights[:] = heights
+    if sids is None:
+        structure_ids[:] = [_new_sid() for _ in structures]
+    else:
+        structure_ids[:] = sids
+        _next_sid = max([_next_sid] + [sid + 1 for sid in sids])
+
+    cell_index.clear()
+    _positions.clear()
+    _reindex_positions()
+    for sid, s in zip(structure_ids, structures):
+        cell_index.add(s, sid)
+
+    structure_versions.clear()
+    _bump_versions(structure_ids)
+    _reset_aggregates()
+
+    _active_sid = get_structure_id(active) if active is not None else None
+    _emit({"op": "reset"})
+
+# ================== OPERATIONS ==================
+
+def _insert_entry(pos, sid, cells, scale, height):
+    structures.insert(pos, cells)
+    structure_scales.insert(pos, scale)
+    structure_heights.insert(pos, height)
+    structure_ids.insert(pos, sid)
+
+def _pop_entry(pos):
+    sid = structure_ids.pop(pos)
+    _positions.pop(sid, None)
+    return sid, structures.pop(pos), structure_scales.pop(pos), structure_heights.pop(pos)
+
+def _apply_add(op):
+    global _next_sid
+    s = ChunkedCellSet(op["cells"])
+    _insert_entry(op["pos"], op["sid"], s, op["scale"], op["height"])
+    _reindex_positions(op["pos"])
+    cell_index.add(s, op["sid"])
+    _next_sid = max(_next_sid, op["sid"] + 1)
+
+def _apply_remove(op):
+    global _active_sid
+    pos = _positions[op["sid"]]
+    cell_index.remove(structures[pos], op["sid"])
+    _pop_entry(pos)
+    _reindex_positions(pos)
+    if _active_sid == op["sid"]:
+        _active_sid = None
+
+def _apply_add_cells(op):
+    structures[_positions[op["sid"]]].update(op["cells"])
+    cell_index.add(op["cells"], op["sid"])
+
+def _apply_remove_cells(op):
+    structures[_positions[op["sid"]]].difference_update(op["cells"])
+    cell_index.remove(op["cells"], op["sid"])
+
+def _apply_move(op):
+    s = structures[_positions[op["sid"]]]
+    cell_index.remove(s, op["sid"])
+    s.translate(op["dx"], op["dy"])
+    cell_index.add(s, op["sid"])
+
+def _apply_scale(op):
+    structure_scales[_positions[op["sid"]]] = op["new"]
+
+def _apply_height(op):
+    structure_heights[_positions[op["sid"]]] = op["new"]
+
+def _apply_active(op):
+    global _active_sid
+    _active_sid = op["new"]
+
+def _apply_merge(op):
+    global _active_sid
+    sid = op["sid"]
+    survivor = structures[_positions[sid]]
+
+    for a in op["absorbed"]:
+        cell_index.remove(structures[_positions[a["sid"]]], a["sid"])
+    if len(op["added"]):
+        survivor.update(op["added"])
+        cell_index.add(op["added"], sid)
+
+    for pos in sorted((_positions[a["sid"]] for a in op["absorbed"]), reverse=True):
+        _pop_entry(pos)
+    _reindex_positions(op["pos"])
+
+    pos = _positions[sid]
+    if pos != op["pos"]:
+        _insert_entry(op["pos"], *_pop_entry(pos))
+        _reindex_positions(op["pos"])
+
+    structure_scales[op["pos"]] = op["scale"]
+    structure_heights[op["pos"]] = op["height"]
+    if _active_sid in {a["sid"] for a in op["absorbed"]}:
+        _active_sid = sid
+
+def _apply_split(op):
+    global _active_sid
+    sid = op["sid"]
+    survivor = structures[_positions[sid]]
+    if len(op["added"]):
+        survivor.difference_update(op["added"])
+        cell_index.remove(op["added"], sid)
+
+    _pop_entry(_positions[sid])
+    entries = [(op["old_pos"], sid, survivor, op["old_scale"], op["old_height"])]
+    for a in op["absorbed"]:
+        entries.append((a["pos"], a["sid"], ChunkedCellSet(a["cells"]), a["scale"], a["height"]))
+    for entry in sorted(entries, key=lambda e: e[0]):
+        _insert_entry(*entry)
+    _reindex_positions(op["pos"])
+
+    for a in op["absorbed"]:
+        cell_index.add(a["cells"], a["sid"])
+    if op.get("active") is not None:
+        _active_sid = op["active"]
 
-def export_scene():
-    os.makedirs(os.path.dirname(SCENE_FILE), exist_ok=True)
+_APPLY = {
+    "add": _apply_add,
+    "remove": _apply_remove,
+    "add_cells": _apply_add_cells,
+    "remove_cells": _apply_remove_cells,
+    "move": _apply_move,
+    "scale": _apply_scale,
+    "height": _apply_height,
+    "active": _apply_active,
+    "merge": _apply_merge,
+    "split": _apply_split,
+}
 
-    data = []
-    for i, s in enumerate(structures):
-        data.append({
-            "blocks": list(s),
-            "scale": structure_scales[i],
-            "height": structure_heights[i],
+_INVERSE_KIND = {
+    "add": "remove", "remove": "add",
+    "add_cells": "remove_cells", "remove_cells": "add_cells",
+    "merge": "split", "split": "merge",
+}
+
+def _touched_sids(op):
+    if op["op"] == "active":
+        return ()
+    return [op["sid"]] + [a["sid"] for a in op.get("absorbed", ())]
+
+def _bump_versions(sids):
+    global _version_clock
+    for sid in sids:
+        if sid in _positions:
+            _version_clock += 1
+            structure_versions[sid] = _version_clock
+        else:
+            structure_versions.pop(sid, None)
+
+def apply_op(op):
+    """Apply one primitive scene operation and notify listeners."""
+    _APPLY[op["op"]](op)
+    touched = _touched_sids(op)
+    _bump_versions(touched)
+    for sid in touched:
+        _update_aggregates(sid, op)
+    _emit(op)
+
+def invert_op(op):
+    """Return the operation that undoes op."""
+    kind = op["op"]
+    if kind in _INVERSE_KIND:
+        return dict(op, op=_INVERSE_KIND[kind])
+    if kind == "move":
+        return dict(op, dx=-op["dx"], dy=-op["dy"])
+    return dict(op, old=op["new"], new=op["old"])
+
+def op_nbytes(op):
+    """Approximate memory held by an operation (cell arrays dominate)."""
+    size = 64
+    for key in ("cells", "added"):
+        if key in op:
+            size += op[key].nbytes
+    for a in op.get("absorbed", ()):
+        size += 64 + a["cells"].nbytes
+    return size
+
+# ================== AGGREGATES ==================
+# Per-structure bounds / block counts and scene totals, updated per
+# operation so the viewer HUD and refocus read them in O(1).
+
+def _union_bounds(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+def _cells_bounds(cells):
+    if len(cells) == 0:
+        return None
+    lo = cells.min(axis=0)
+    hi = cells.max(axis=0)
+    return (int(lo[0]), int(lo[1]), int(hi[0]), int(hi[1]))
+
+def _touches_edge(bounds, cells):
+    """True if any cell lies on the border of bounds."""
+    return bool(np.any(
+        (cells[:, 0] == bounds[0]) | (cells[:, 1] == bounds[1])
+        | (cells[:, 0] == bounds[2]) | (cells[:, 1] == bounds[3])
+    ))
+
+def _next_bounds(sid, op, old):
+    """New bounds of sid after op, avoiding a full rescan where possible."""
+    kind = op["op"]
+    if op.get("sid") == sid and old is not None:
+        if kind in ("scale", "height"):
+            return old
+        if kind == "move":
+            dx, dy = op["dx"], op["dy"]
+            return (old[0] + dx, old[1] + dy, old[2] + dx, old[3] + dy)
+        if kind in ("add_cells", "merge"):
+            return _union_bounds(old, _cells_bounds(op["cells" if kind == "add_cells" else "added"]))
+        if kind == "remove_cells" and not _touches_edge(old, op["cells"]):
+            return old
+    return structures[_positions[sid]].bounds()
+
+def _drop_aggregates(sid):
+    global _total_blocks, _scene_bounds_dirty
+    bounds = structure_bounds.pop(sid, None)
+    _total_blocks -= _blocks.pop(sid, 0)
+    if bounds is not None:
+        height = _height_of.pop(sid)
+        _height_counts[height] -= 1
+        if not _height_counts[height]:
+            del _height_counts[height]
+        # Shrinking an extreme: rescan lazily (O(structures))
+        if _scene_bounds is not None and any(
+                bounds[k] == _scene_bounds[k] for k in range(4)):
+            _scene_bounds_dirty = True
+
+def _add_aggregates(sid, bounds):
+    global _total_blocks, _scene_bounds
+    pos = _positions[sid]
+    structure_bounds[sid] = bounds
+    _blocks[sid] = len(structures[pos]) * structure_heights[pos]
+    _total_blocks += _blocks[sid]
+    if bounds is not None:
+        _height_of[sid] = structure_heights[pos]
+        _height_counts[_height_of[sid]] += 1
+        if not _scene_bounds_dirty:
+            _scene_bounds = _union_bounds(_scene_bounds, bounds)
+
+def _update_aggregates(sid, op):
+    old = structure_bounds.get(sid)
+    _drop_aggregates(sid)
+    if sid in _positions:
+        _add_aggregates(sid, _next_bounds(sid, op, old))
+
+def _reset_aggregates():
+    global _total_blocks, _scene_bounds, _scene_bounds_dirty
+    structure_bounds.clear()
+    _blocks.clear()
+    _height_of.clear()
+    _height_counts.clear()
+    _total_blocks = 0
+    _scene_bounds = None
+    _scene_bounds_dirty = False
+    for sid, s in zip(structure_ids, structures):
+        _add_aggregates(sid, s.bounds())
+
+def scene_bounds():
+    """(min_x, min_y, max_x, max_y) over all footprint cells, or None when empty."""
+    global _scene_bounds, _scene_bounds_dirty
+    if _scene_bounds_dirty:
+        _scene_bounds = None
+        for bounds in structure_bounds.values():
+            _scene_bounds = _union_bounds(_scene_bounds, bounds)
+        _scene_bounds_dirty = False
+    return _scene_bounds
+
+def scene_summary():
+    """
+    Scene totals without walking the cells:
+    structures, blocks (cells x height), max_height (of non-empty
+    structures) and bounds (see scene_bounds).
+    """
+    return {
+        "structures": len(structures),
+        "blocks": _total_blocks,
+        "max_height": max(_height_counts) if _height_counts else 0,
+        "bounds": scene_bounds(),
+    }
+
+# ================== AUTO MERGE ==================
+
+# A cell touches another structure if it overlaps it or is 4-adjacent
+_TOUCH_OFFSETS = np.array([(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.int32)
+
+def _touching_sids(index):
+    cells = structures[index].to_array()
+    ring = (cells[:, None, :] + _TOUCH_OFFSETS[None, :, :]).reshape(-1, 2)
+    found = cell_index.owner_ids(ring)
+    found.discard(structure_ids[index])
+    return found
+
+def _collapse_group(sids):
+    """
+    Merge a group of structures into one.
+
+    The merged structure takes the list position and scale of the
+    earliest member and the tallest height. Cells of the smaller
+    members are folded into the largest one, so the cost is the size
+    of what gets absorbed rather than the size of the scene.
+    """
+    positions = sorted(_positions[sid] for sid in sids)
+    target = positions[0]
+    big = max(positions, key=lambda p: len(structures[p]))
+    survivor = structures[big]
+
+    absorbed = []
+    added = []
+    for pos in positions:
+        if pos == big:
+            continue
+        cells = structures[pos].to_array()
+        absorbed.append({
+            "sid": structure_ids[pos],
+            "pos": pos,
+            "cells": cells,
+            "scale": structure_scales[pos],
+            "height": structure_heights[pos],
         })
+        added.append(cells[~survivor.contains_many(cells)])
+
+    added = np.unique(np.concatenate(added), axis=0) if added else EMPTY_CELLS
+    added.flags.writeable = False
+    active = _active_sid if _active_sid in {a["sid"] for a in absorbed} else None
 
-    tmp = SCENE_FILE + ".tmp"
-    with open(tmp, "w") as f:
-        json.dump(data, f)
+    apply_op({
+        "op": "merge",
+        "sid": structure_ids[big],
+        "pos": target,
+        "old_pos": big,
+        "old_scale": structure_scales[big],
+        "old_height": structure_heights[big],
+        "scale": structure_scales[target],
+        "height": max(structure_heights[p] for p in positions),
+        "absorbed": absorbed,
+        "added": added,
+        "active": active,
+    })
+    return structure_ids[target]
 
+def auto_merge_structures(indices=None):
+    """
+    Union structures that touch the given ones (all when None).
+
+    Only the neighbour ring of each given footprint is looked up in the
+    cell index; touching pairs are joined in a disjoint-set and each
+    resulting group is collapsed once.
+    Returns the new list positions of the given structures.
+    """
+    if indices is None:
+        indices = range(len(structures))
+    sids = [structure_ids[i] for i in indices if 0 <= i < len(structures)]
+
+    groups = DisjointSet(sids)
+    for sid in sids:
+        for other in _touching_sids(_positions[sid]):
+            groups.union(sid, other)
+
+    survivor = {}
+    for members in groups.groups().values():
+        kept = _collapse_group(members)
+        for sid in members:
+            survivor[sid] = kept
+
+    return [_positions[survivor.get(sid, sid)] for sid in sids]
+
+# ================== LOOKUP ==================
+
+def get_structure_at_cell(cell):
+    """
+    Returns index of structure that contains the given grid cell.
+    If none found, returns None.
+    """
+    sid = cell_index.owner(cell)
+    if sid is None:
+        return None
+    owners = cell_index.owners(cell)
+    if len(owners) == 1:
+        return _positions[sid]
+    # Overlapping structures: lowest list position wins
+    return min(_positions[o] for o in owners)
+
+def get_structure_id(index):
+    if 0 <= index < len(structure_ids):
+        return structure_ids[index]
+    return None
+
+def get_structure_version(index):
+    """Geometry version of structure index (changes on every cell / height / scale edit)."""
+    return structure_versions.get(structure_ids[index])
+
+# ================== BULK ACCESS ==================
+
+def structure_cells(index):
+    """(N, 2) int32 array of a structure's footprint cells."""
+    if 0 <= index < len(structures):
+        return structures[index].to_array()
+    return EMPTY_CELLS
+
+# ================== PERSISTENCE ==================
+
+def scene_entries():
+    """(sid, cells array, scale, height) per structure, in list order."""
+    return [
+        (structure_ids[i], s.to_array(), structure_scales[i], structure_heights[i])
+        for i, s in enumerate(structures)
+    ]
+
+def scene_version():
+    """
+    Immutable copy of the scene: (scene_entries(), active sid).
+
+    The cell arrays are the sets' cached read-only arrays (replaced, never
+    modified, on edits), so this is cheap and stays valid while the scene
+    keeps changing; data/scene_writer.py writes such versions off-thread.
+    """
+    return scene_entries(), _active_sid
+
+def write_scene_file(path, entries, active_sid=None, fmt=None, session=0, seq=0,
+                     retries=REPLACE_RETRIES):
+    """
+    Write a scene version atomically (temp file + os.replace).
+
+    The replace is retried with a doubling delay while the target is
+    locked (a reader holding it open on Windows); the PermissionError
+    is raised once retries run out. Returns the number of retries used.
+    """
+    if fmt is None:
+        fmt = "json" if path.endswith(".json") else "binary"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    tmp = path + ".tmp"
+    if fmt == "json":
+        with open(tmp, "w") as f:
+            exporter.write_scene_json(f, entries)
+    else:
+        with open(tmp, "wb") as f:
+            exporter.write_scene(f, entries, active_sid, session=session, seq=seq)
+
+    delay = REPLACE_RETRY_DELAY
+    for attempt in range(retries + 1):
+        try:
+            os.replace(tmp, path)
+            return attempt
+        except PermissionError:
+            if attempt == retries:
+                raise
+            time.sleep(delay)
+            delay *= 2
+
+def export_scene(path=None, fmt=None, session=0, seq=0):
+    """
+    Write the scene snapshot atomically.
+
+    fmt is "binary" (default) or "json"; when omitted it follows the
+    extension of path. session / seq tag binary journal checkpoints.
+    Returns False if the file stayed locked through every retry.
+    """
+    entries, active_sid = scene_version()
     try:
-        os.replace(tmp, SCENE_FILE)
+        write_scene_file(path or SCENE_FILE, entries, active_sid, fmt, session, seq)
     except PermissionError:
-        pass
+        return False
+    return True
 
-def load_scene():
-    global active_structure_index
+def find_scene_file():
+    for path in (SCENE_FILE, SCENE_JSON_FILE):
+        if os.path.exists(path):
+            return path
+    return None
 
-    if not os.path.exists(SCENE_FILE):
+def load_scene(path=None):
+    """
+    Load a snapshot, auto-detecting binary vs legacy JSON by content.
+
+    Without a path the binary snapshot is preferred, then the old
+    data/scene_snapshot.json.
+    """
+    path = path or find_scene_file()
+    if path is None:
         return
 
     try:
-        with open(SCENE_FILE, "r") as f:
-            data = json.load(f)
-    except:
+        load_scene_file(path)
+    except (OSError, ValueError):
         return
 
-    structures.clear()
-    structure_scales.clear()
-    structure_heights.clear()
+def load_scene_file(path):
+    """
+    Load a snapshot like load_scene(), but let errors through.
+
+    Raises OSError when the file can't be read and ValueError (such as
+    exporter.SceneFormatError) when it isn't a valid scene; the scene is
+    then unchanged.
+    """
+    if exporter.is_binary_scene(path):
+        load_binary_scene(path)
+    else:
+        with open(path, "r") as f:
+            cells, scales, heights = exporter.read_scene_json(f)
+        replace_scene(cells, scales, heights, active=0)
 
-    for s in data:
-        structures.append(set(tuple(b) for b in s["blocks"]))
-        structure_scales.append(s.get("scale", 1.0))
-        structure_heights.append(s.get("height", 1))
+def load_binary_scene(path):
+    """Load a binary snapshot. Returns its (session, seq) tag."""
+    with exporter.MappedScene.open(path) as scene:
+        sids = list(scene.sids)
+        cell_sets = [ChunkedCellSet(scene.cells(i)) for i in range(len(scene))]
+        scales, heights = list(scene.scales), list(scene.heights)
+        active_sid = scene.active_sid
+        tag = (scene.session, scene.seq)
 
-    active_structure_index = 0 if structures else None
+    active = sids.index(active_sid) if active_sid in sids else 0
+    replace_scene(cell_sets, scales, heights, active=active, sids=sids)
+    return tag
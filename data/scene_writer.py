@@ -0,0 +1,124 @@
+"""
+scene_writer.py
+---------------
+Background, coalescing writer for scene snapshots.
+
+Used by:
+- data/journal.py (JournalWriter checkpoints)
+
+submit() hands over an immutable scene version (scene_data.scene_version())
+and returns at once; a writer thread serializes it and replaces the file
+atomically, retrying while the file is locked. Versions submitted while
+a write is in progress are coalesced: only the newest one waiting is
+written, so a burst of checkpoints costs one extra write at most.
+
+written is the tag of the last version on disk. A write that still
+fails after its retries is counted in stats and not retried; the next
+submit() tries again.
+
+stats reports the write latency (serialize + replace), the lag from
+submit to disk, the backlog (versions submitted but not yet written or
+failed), coalesced versions, retries and failures. The editor shows the
+latency, lag, backlog and failures in its trace overlay (T key).
+
+Only compaction checkpoints go through the writer; JournalWriter still
+writes the startup and scene-reset snapshots synchronously.
+"""
+
+import threading
+import time
+
+from data import scene_data
+
+
+class SceneWriter:
+    def __init__(self, retries=scene_data.REPLACE_RETRIES):
+        self.retries = retries
+
+        self._cond = threading.Condition()
+        self._pending = None      # newest version waiting to be written
+        self._busy = False        # a version is being written
+        self._running = True
+        self.written = None       # tag of the last version on disk
+        self.last_error = None
+
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "coalesced": 0,      # replaced by a newer version before being written
+            "failed": 0,         # still locked after every retry
+            "retries": 0,
+            "backlog": 0,        # submitted, not yet written or failed
+            "write_ms": 0.0,     # last write (serialize + replace)
+            "write_ms_max": 0.0,
+            "lag_ms": 0.0,       # submit -> on disk, last write
+        }
+
+        self._thread = threading.Thread(target=self._run, name="scene-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path, version, tag=None, fmt="binary", session=0, seq=0):
+        """
+        Queue a scene version (entries, active sid) for writing to path.
+
+        tag identifies the version in `written` once it is on disk.
+        """
+        entries, active_sid = version
+        job = (path, entries, active_sid, fmt, session, seq, tag, time.perf_counter())
+        with self._cond:
+            if self._pending is not None:
+                self.stats["coalesced"] += 1
+            else:
+                self.stats["backlog"] += 1
+            self.stats["submitted"] += 1
+            self._pending = job
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self._running)
+                if self._pending is None:
+                    return
+                job, self._pending = self._pending, None
+                self._busy = True
+
+            path, entries, active_sid, fmt, session, seq, tag, submitted = job
+            t0 = time.perf_counter()
+            error = None
+            try:
+                retries = scene_data.write_scene_file(path, entries, active_sid, fmt,
+                                                      session, seq, self.retries)
+            except OSError as e:
+                retries = self.retries
+                error = e
+            done = time.perf_counter()
+
+            with self._cond:
+                self.stats["retries"] += retries
+                self.stats["backlog"] -= 1
+                if error is None:
+                    self.written = tag
+                    self.stats["written"] += 1
+                    self.stats["write_ms"] = (done - t0) * 1000.0
+                    self.stats["write_ms_max"] = max(self.stats["write_ms_max"],
+                                                      self.stats["write_ms"])
+                    self.stats["lag_ms"] = (done - submitted) * 1000.0
+                else:
+                    self.last_error = error
+                    self.stats["failed"] += 1
+                self._busy = False
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every submitted version is written (or failed)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._busy, timeout)
+
+    def close(self, timeout=None):
+        """Write what is pending, then stop the thread."""
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout)
@@ -0,0 +1,223 @@
+"""
+shm_transport.py
+----------------
+Optional shared-memory link between the editor and the viewer.
+
+Used by:
+- Phase 6.x Editor (ShmPublisher, fed by the JournalWriter)
+- phase7_viewer/scene_sync.py (ShmReader)
+
+The editor mirrors every journal record (same seq numbers, same
+payloads as data/journal.py) into a ring buffer in a
+multiprocessing.shared_memory segment. The viewer polls a small header
+each frame and applies new records straight from memory, without any
+file I/O on the way. When the ring cannot serve it (new session, or
+the viewer fell more than one ring behind) the viewer resyncs from the
+journal files and continues from there.
+
+Segment layout (little-endian):
+
+    header : magic "ABSM", version u32, session u32, capacity u32,
+             gen u64 (odd while the writer updates),
+             write_pos u64, last_seq u64, first_pos u64, first_seq u64
+    ring   : capacity bytes of journal records (length u32, seq u64, payload)
+
+Positions are total byte counts; the ring offset is pos % capacity.
+"""
+
+import os
+import struct
+import sys
+from collections import deque
+from multiprocessing import shared_memory
+
+from data.journal import RECORD
+
+SHM_ENV = "AIRBLOCKS_SHM"
+
+MAGIC = b"ABSM"
+VERSION = 1
+DEFAULT_CAPACITY = 8 * 1024 * 1024
+
+HEADER = struct.Struct("<4sIIIQQQQQ")
+GEN = struct.Struct("<Q")
+GEN_OFFSET = 16
+HEADER_RETRIES = 10000
+
+
+def _untrack(shm):
+    # Before 3.13 attaching registers the segment with this process's
+    # resource tracker, which would unlink it when the viewer exits.
+    if os.name == "posix" and sys.version_info < (3, 13):
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+
+# ================== WRITER (EDITOR) ==================
+
+class ShmPublisher:
+    def __init__(self, name, session, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.session = session
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER.size + capacity)
+        self._buf = self._shm.buf
+        self._gen = 0
+        self._write_pos = 0
+        self._last_seq = 0
+        self._records = deque()     # (pos, seq) of records still in the ring
+        self._write_header()
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def _write_header(self):
+        first_pos, first_seq = self._records[0] if self._records else (self._write_pos, self._last_seq + 1)
+        HEADER.pack_into(
+            self._buf, 0, MAGIC, VERSION, self.session, self.capacity,
+            self._gen, self._write_pos, self._last_seq, first_pos, first_seq,
+        )
+
+    def _bump_gen(self):
+        self._gen += 1
+        GEN.pack_into(self._buf, GEN_OFFSET, self._gen)
+
+    def reset(self, session, seq):
+        """Start a new session at seq (nothing before it is in the ring)."""
+        self._bump_gen()
+        self.session = session
+        self._last_seq = seq
+        self._records.clear()
+        self._write_header()
+        self._bump_gen()
+
+    def publish(self, seq, payload):
+        """Append one record. Returns False if it was too large for the ring."""
+        record = RECORD.pack(len(payload), seq) + payload
+        size = len(record)
+
+        self._bump_gen()
+
+        # Drop the oldest records until the new one fits
+        while self._records and self._write_pos + size - self._records[0][0] > self.capacity:
+            self._records.popleft()
+
+        if size <= self.capacity:
+            # Invalidate overwritten records before touching their bytes
+            self._records.append((self._write_pos, seq))
+            self._write_header()
+
+            start = self._write_pos % self.capacity
+            head = min(size, self.capacity - start)
+            base = HEADER.size
+            self._buf[base + start:base + start + head] = record[:head]
+            if head < size:
+                self._buf[base:base + size - head] = record[head:]
+        else:
+            # Too large for the ring: readers fall back to the journal file
+            self._records.clear()
+
+        self._write_pos += size
+        self._last_seq = seq
+        self._write_header()
+        self._bump_gen()
+        return size <= self.capacity
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ================== READER (VIEWER) ==================
+
+class ShmReader:
+    """Reads journal records from a segment created by ShmPublisher (never writes)."""
+
+    def __init__(self, shm):
+        self._shm = shm
+        self._buf = shm.buf
+        self._read_pos = None
+        self._read_seq = None
+
+    @classmethod
+    def attach(cls, name):
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except (FileNotFoundError, OSError):
+            return None
+        _untrack(shm)
+        if bytes(shm.buf[:4]) != MAGIC:
+            shm.close()
+            return None
+        return cls(shm)
+
+    def _header(self):
+        # Seqlock: retry while the writer is mid-update
+        for _ in range(HEADER_RETRIES):
+            head = HEADER.unpack_from(self._buf, 0)
+            gen = head[4]
+            if gen % 2 == 0 and GEN.unpack_from(self._buf, GEN_OFFSET)[0] == gen:
+                return head
+        return None
+
+    def read_after(self, session, seq):
+        """
+        Return [(seq, payload), ...] for every record after seq.
+
+        Returns None when the ring cannot serve it (different session or
+        records already overwritten); the caller resyncs from files.
+        """
+        head = self._header()
+        if head is None:
+            return None
+        _, _, ring_session, capacity, _, write_pos, last_seq, first_pos, first_seq = head
+        if ring_session != session:
+            self._read_pos = None
+            return None
+        if last_seq <= seq:
+            return []
+        if first_seq > seq + 1:
+            self._read_pos = None
+            return None
+
+        if self._read_pos is None or self._read_seq != seq or self._read_pos < first_pos:
+            start, expect_skip = first_pos, True
+        else:
+            start, expect_skip = self._read_pos, False
+
+        size = write_pos - start
+        offset = start % capacity
+        base = HEADER.size
+        first = min(size, capacity - offset)
+        data = bytes(self._buf[base + offset:base + offset + first])
+        if first < size:
+            data += bytes(self._buf[base:base + size - first])
+
+        # The writer may have recycled part of what we copied
+        head = self._header()
+        if head is None or head[7] > start:
+            self._read_pos = None
+            return None
+
+        records = []
+        pos = 0
+        while pos + RECORD.size <= len(data):
+            length, rec_seq = RECORD.unpack_from(data, pos)
+            end = pos + RECORD.size + length
+            if rec_seq > seq:
+                records.append((rec_seq, data[pos + RECORD.size:end]))
+            elif not expect_skip:
+                break
+            pos = end
+
+        self._read_pos = start + pos
+        self._read_seq = records[-1][0] if records else seq
+        return records
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
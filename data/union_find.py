@@ -0,0 +1,49 @@
+"""
+union_find.py
+-------------
+Disjoint-set (union-find) over structure ids.
+
+Used by:
+- data/scene_data.py (incremental auto-merge)
+
+Union by size + path halving, so each operation is effectively O(1).
+"""
+
+
+class DisjointSet:
+    def __init__(self, items=()):
+        self._parent = {}
+        self._size = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item not in self._parent:
+            self._parent[item] = item
+            self._size[item] = 1
+
+    def find(self, item):
+        self.add(item)
+        parent = self._parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        """Join the sets of a and b. Returns the new root."""
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return ra
+        if self._size[ra] < self._size[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._size[ra] += self._size[rb]
+        return ra
+
+    def groups(self):
+        """Return {root: [members...]} for every set with > 1 member."""
+        out = {}
+        for item in self._parent:
+            out.setdefault(self.find(item), []).append(item)
+        return {root: members for root, members in out.items() if len(members) > 1}
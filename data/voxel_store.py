@@ -0,0 +1,311 @@
+"""
+voxel_store.py
+--------------
+Chunked sparse cell storage for AirBlocks structures.
+
+Used by:
+- data/scene_data.py
+- Phase 6.x Editor (bulk cell access for drawing)
+- Phase 7.x Viewer (bulk cell access for rendering)
+
+A structure footprint is stored as fixed-size square tiles
+(CHUNK_SIZE x CHUNK_SIZE NumPy bitmaps) keyed by chunk coordinate,
+instead of one Python tuple per cell.
+Cells are still plain (x, y) grid tuples at the API boundary.
+"""
+
+import numpy as np
+
+# ================== CHUNK LAYOUT ==================
+
+CHUNK_SHIFT = 4
+CHUNK_SIZE = 1 << CHUNK_SHIFT     # 16 x 16 cells per tile
+CHUNK_MASK = CHUNK_SIZE - 1
+
+EMPTY_CELLS = np.zeros((0, 2), dtype=np.int32)
+EMPTY_CELLS.flags.writeable = False
+
+
+# ================== HELPERS ==================
+
+def as_cell_array(cells):
+    """
+    Convert cells to an (N, 2) int32 array.
+
+    Accepts a ChunkedCellSet, a NumPy array or any iterable of (x, y).
+    """
+    if isinstance(cells, ChunkedCellSet):
+        return cells.to_array()
+    if isinstance(cells, np.ndarray):
+        return cells.astype(np.int32, copy=False).reshape(-1, 2)
+
+    cells = list(cells)
+    if not cells:
+        return EMPTY_CELLS
+    return np.array(cells, dtype=np.int32).reshape(-1, 2)
+
+
+def chunk_keys_of(arr):
+    """Return packed int64 chunk keys for every row of an (N, 2) array."""
+    cx = (arr[:, 0] >> CHUNK_SHIFT).astype(np.int64)
+    cy = (arr[:, 1] >> CHUNK_SHIFT).astype(np.int64)
+    return (cx << 32) | (cy & 0xFFFFFFFF)
+
+
+def chunk_rows(arr):
+    """
+    Split an (N, 2) cell array by chunk.
+
+    Yields ((cx, cy), rows) once per touched chunk, where rows are
+    the indices into arr that fall inside that chunk.
+    """
+    if len(arr) == 0:
+        return
+
+    keys = chunk_keys_of(arr)
+    order = np.argsort(keys, kind="stable")
+    splits = np.flatnonzero(np.diff(keys[order])) + 1
+
+    for rows in np.split(order, splits):
+        first = arr[rows[0]]
+        yield (int(first[0]) >> CHUNK_SHIFT, int(first[1]) >> CHUNK_SHIFT), rows
+
+
+def group_by_chunk(arr):
+    """
+    Yield ((cx, cy), local_x, local_y) once per touched chunk,
+    so callers touch each tile with a single vectorized write.
+    """
+    lx = arr[:, 0] & CHUNK_MASK
+    ly = arr[:, 1] & CHUNK_MASK
+    for key, rows in chunk_rows(arr):
+        yield key, lx[rows], ly[rows]
+
+
+# ================== CHUNKED CELL SET ==================
+
+class ChunkedCellSet:
+    """
+    Set-like container of (x, y) grid cells backed by chunk bitmaps.
+
+    Supports the set operations the editor relies on
+    (in, len, iteration, add, |=) plus vectorized bulk access
+    through to_array().
+    """
+
+    __slots__ = ("_chunks", "_count", "_array")
+
+    def __init__(self, cells=()):
+        self._chunks = {}
+        self._count = 0
+        self._array = None
+        self.update(cells)
+
+    # ---------- set protocol ----------
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def __contains__(self, cell):
+        x, y = cell
+        bitmap = self._chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        return bitmap is not None and bool(bitmap[x & CHUNK_MASK, y & CHUNK_MASK])
+
+    def contains_many(self, cells):
+        """Vectorized membership test: bool mask, one entry per cell."""
+        arr = as_cell_array(cells)
+        out = np.zeros(len(arr), dtype=bool)
+        lx = arr[:, 0] & CHUNK_MASK
+        ly = arr[:, 1] & CHUNK_MASK
+        for key, rows in chunk_rows(arr):
+            bitmap = self._chunks.get(key)
+            if bitmap is not None:
+                out[rows] = bitmap[lx[rows], ly[rows]]
+        return out
+
+    def __iter__(self):
+        return map(tuple, self.to_array().tolist())
+
+    def __eq__(self, other):
+        if isinstance(other, ChunkedCellSet):
+            return (
+                self._count == other._count
+                and np.array_equal(self.to_array(), other.to_array())
+            )
+        if isinstance(other, (set, frozenset)):
+            return self._count == len(other) and all(c in self for c in other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __repr__(self):
+        return f"ChunkedCellSet({self._count} cells, {len(self._chunks)} chunks)"
+
+    def add(self, cell):
+        x, y = cell
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        bitmap = self._chunks.get(key)
+        if bitmap is None:
+            bitmap = self._chunks[key] = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=bool)
+        if not bitmap[x & CHUNK_MASK, y & CHUNK_MASK]:
+            bitmap[x & CHUNK_MASK, y & CHUNK_MASK] = True
+            self._count += 1
+            self._array = None
+
+    def discard(self, cell):
+        x, y = cell
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        bitmap = self._chunks.get(key)
+        if bitmap is not None and bitmap[x & CHUNK_MASK, y & CHUNK_MASK]:
+            bitmap[x & CHUNK_MASK, y & CHUNK_MASK] = False
+            self._count -= 1
+            self._array = None
+            if not bitmap.any():
+                del self._chunks[key]
+
+    def update(self, cells):
+        """Add many cells at once (one bitmap write per chunk)."""
+        if isinstance(cells, ChunkedCellSet):
+            self._merge_chunks(cells)
+            return
+
+        arr = as_cell_array(cells)
+        if len(arr) == 0:
+            return
+
+        for key, lx, ly in group_by_chunk(arr):
+            bitmap = self._chunks.get(key)
+            if bitmap is None:
+                bitmap = self._chunks[key] = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=bool)
+                before = 0
+            else:
+                before = int(np.count_nonzero(bitmap))
+            bitmap[lx, ly] = True
+            self._count += int(np.count_nonzero(bitmap)) - before
+        self._array = None
+
+    def difference_update(self, cells):
+        """Remove many cells at once (one bitmap write per chunk)."""
+        arr = as_cell_array(cells)
+        if len(arr) == 0:
+            return
+
+        for key, lx, ly in group_by_chunk(arr):
+            bitmap = self._chunks.get(key)
+            if bitmap is None:
+                continue
+            before = int(np.count_nonzero(bitmap))
+            bitmap[lx, ly] = False
+            after = int(np.count_nonzero(bitmap))
+            self._count -= before - after
+            if after == 0:
+                del self._chunks[key]
+        self._array = None
+
+    def _merge_chunks(self, other):
+        for key, other_bitmap in other._chunks.items():
+            bitmap = self._chunks.get(key)
+            if bitmap is None:
+                self._chunks[key] = other_bitmap.copy()
+                self._count += int(np.count_nonzero(other_bitmap))
+            else:
+                before = int(np.count_nonzero(bitmap))
+                np.logical_or(bitmap, other_bitmap, out=bitmap)
+                self._count += int(np.count_nonzero(bitmap)) - before
+        self._array = None
+
+    def copy(self):
+        clone = ChunkedCellSet()
+        clone._chunks = {k: b.copy() for k, b in self._chunks.items()}
+        clone._count = self._count
+        clone._array = self._array
+        return clone
+
+    # ---------- bulk access ----------
+
+    def to_array(self):
+        """
+        Return all cells as a read-only (N, 2) int32 array.
+
+        Cells are sorted by chunk, then x, then y.
+        The array is cached until the set is modified.
+        """
+        if self._array is not None:
+            return self._array
+
+        if not self._chunks:
+            self._array = EMPTY_CELLS
+            return self._array
+
+        parts = []
+        for cx, cy in sorted(self._chunks):
+            lx, ly = np.nonzero(self._chunks[(cx, cy)])
+            part = np.empty((len(lx), 2), dtype=np.int32)
+            part[:, 0] = lx + (cx << CHUNK_SHIFT)
+            part[:, 1] = ly + (cy << CHUNK_SHIFT)
+            parts.append(part)
+
+        arr = np.concatenate(parts)
+        arr.flags.writeable = False
+        self._array = arr
+        return arr
+
+    def bounds(self):
+        """
+        (min_x, min_y, max_x, max_y) of the cells, or None when empty.
+
+        Only the outermost chunks are inspected.
+        """
+        if not self._chunks:
+            return None
+
+        keys = list(self._chunks)
+        lo_cx = min(k[0] for k in keys)
+        hi_cx = max(k[0] for k in keys)
+        lo_cy = min(k[1] for k in keys)
+        hi_cy = max(k[1] for k in keys)
+
+        def edge(index, value, axis, pick):
+            # pick (min / max) of the occupied local rows / columns in edge chunks
+            return pick(
+                pick(np.flatnonzero(b.any(axis=axis)))
+                for k, b in self._chunks.items() if k[index] == value
+            ) + (value << CHUNK_SHIFT)
+
+        return (
+            int(edge(0, lo_cx, 1, min)),
+            int(edge(1, lo_cy, 0, min)),
+            int(edge(0, hi_cx, 1, max)),
+            int(edge(1, hi_cy, 0, max)),
+        )
+
+    def translate(self, dx, dy):
+        """Shift every cell by (dx, dy) in place."""
+        if dx == 0 and dy == 0:
+            return
+
+        if dx & CHUNK_MASK == 0 and dy & CHUNK_MASK == 0:
+            # Chunk-aligned shift: just re-key the tiles
+            sx, sy = dx >> CHUNK_SHIFT, dy >> CHUNK_SHIFT
+            self._chunks = {(cx + sx, cy + sy): b for (cx, cy), b in self._chunks.items()}
+            self._array = None
+            return
+
+        shifted = self.to_array() + np.array([dx, dy], dtype=np.int32)
+        self._chunks = {}
+        self._count = 0
+        self.update(shifted)
+
+    def chunk_keys(self):
+        return list(self._chunks)
+
+    @property
+    def nbytes(self):
+        return len(self._chunks) * CHUNK_SIZE * CHUNK_SIZE
@@ -0,0 +1,106 @@
+"""
+blueprint.py
+------------
+Hologram preview of the blueprint being dragged in the gesture editor.
+
+Used by:
+- phase6_1_final_selection.py
+
+All blueprint cells are drawn together: their translucent fills are
+merged into one mask and blended over the mask's bounding box once,
+then outlines, X braces and scanlines go out as one cv2.polylines call
+each. The frame is never copied, however many cells the blueprint has.
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+# FIXED CYAN BGR
+FILL_COLOR = (255, 255, 0)
+EDGE_COLOR = (255, 200, 0)
+SCAN_COLOR = (0, 220, 220)
+FILL_ALPHA = 0.16
+
+SCAN_SPACING = 12
+SCAN_SPEED = 80          # px per second
+PARALLAX_AMPLITUDE = 3   # px
+PARALLAX_RATE = 2        # rad per second
+
+
+def _blend_fill(frame, cells, size, parallax):
+    """Blend FILL_COLOR over the union of the cell squares (edges inclusive)."""
+    lo = cells.min(axis=0)
+    hi = cells.max(axis=0)
+    gw, gh = hi - lo + 1
+
+    occupied = np.zeros((gh, gw), dtype=np.uint8)
+    occupied[cells[:, 1] - lo[1], cells[:, 0] - lo[0]] = 1
+
+    # One pixel more than the cells cover: rectangles include their far edge
+    mask = np.zeros((gh * size + 1, gw * size + 1), dtype=np.uint8)
+    mask[:-1, :-1] = np.repeat(np.repeat(occupied, size, axis=0), size, axis=1)
+    mask[1:, :] |= mask[:-1, :]
+    mask[:, 1:] |= mask[:, :-1]
+
+    h, w = frame.shape[:2]
+    x0, y0 = int(lo[0]) * size, int(lo[1]) * size + parallax
+    fx0, fy0 = max(x0, 0), max(y0, 0)
+    fx1, fy1 = min(x0 + mask.shape[1], w), min(y0 + mask.shape[0], h)
+    if fx0 >= fx1 or fy0 >= fy1:
+        return
+
+    region = frame[fy0:fy1, fx0:fx1]
+    mask = np.ascontiguousarray(mask[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0])
+    fill = np.empty_like(region)
+    fill[:] = FILL_COLOR
+    blended = cv2.addWeighted(fill, FILL_ALPHA, region, 1.0 - FILL_ALPHA, 0)
+    cv2.copyTo(blended, mask, region)
+
+
+def draw_blueprint(frame, cells, size, t):
+    """
+    Draw the blueprint cells onto a BGR frame in place.
+
+    :param cells: iterable of (x, y) grid cells
+    :param size: grid cell size in pixels
+    :param t: time in seconds, drives parallax and scanlines
+    """
+    cells = np.array(list(cells), dtype=np.int32).reshape(-1, 2)
+    if len(cells) == 0:
+        return
+
+    # Subtle parallax (based on time, not input)
+    parallax = int(PARALLAX_AMPLITUDE * math.sin(t * PARALLAX_RATE))
+    _blend_fill(frame, cells, size, parallax)
+
+    x = cells[:, 0] * size
+    y = cells[:, 1] * size + parallax
+
+    # Outline
+    corners = np.stack([
+        np.stack([x, y], axis=1),
+        np.stack([x + size, y], axis=1),
+        np.stack([x + size, y + size], axis=1),
+        np.stack([x, y + size], axis=1),
+    ], axis=1)
+    cv2.polylines(frame, list(corners), True, EDGE_COLOR, 2)
+
+    # X brace
+    braces = np.ascontiguousarray(
+        np.concatenate([corners[:, [0, 2]], corners[:, [1, 3]]])
+    )
+    cv2.polylines(frame, list(braces), False, EDGE_COLOR, 1)
+
+    # Hologram scanlines, same phase in every cell
+    scan_y = int((t * SCAN_SPEED) % size)
+    rows = np.arange(scan_y, size, SCAN_SPACING)
+    if len(rows):
+        sy = (y[:, None] + rows[None, :]).reshape(-1)
+        sx = np.repeat(x, len(rows))
+        scans = np.stack([
+            np.stack([sx, sy], axis=1),
+            np.stack([sx + size, sy], axis=1),
+        ], axis=1)
+        cv2.polylines(frame, list(scans), False, SCAN_COLOR, 1)
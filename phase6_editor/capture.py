@@ -0,0 +1,91 @@
+"""
+capture.py
+----------
+Threaded camera capture for the gesture editor.
+
+Used by:
+- phase6_1_final_selection.py
+
+A background thread keeps reading the camera and only ever holds the
+newest frame. read() hands the main loop that frame together with its
+capture time; frames replaced before anyone read them are counted as
+dropped. When processing falls behind, the editor skips ahead instead
+of working through a backlog, so latency stays bounded.
+"""
+
+import threading
+import time
+
+import cv2
+
+
+class LatestFrameCapture:
+    def __init__(self, source=0, buffer_size=1):
+        self.cap = cv2.VideoCapture(source)
+        # Keep the driver queue short as well (not every backend honours it)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._stamp = 0.0
+        self._index = 0          # frames captured
+        self._read_index = 0     # index of the last frame handed out
+        self._ended = False
+        self._running = False
+        self._thread = None
+
+        self.stats = {
+            "captured": 0,
+            "delivered": 0,
+            "dropped": 0,        # captured but replaced before being read
+            "age_ms": 0.0,       # capture -> read() delay of the last frame
+        }
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="camera", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while self._running:
+            ok, frame = self.cap.read()
+            stamp = time.time()
+            with self._cond:
+                if not ok:
+                    self._ended = True
+                    self._cond.notify_all()
+                    return
+                if self._index > self._read_index:
+                    self.stats["dropped"] += 1
+                self._frame = frame
+                self._stamp = stamp
+                self._index += 1
+                self.stats["captured"] += 1
+                self._cond.notify_all()
+
+    def read(self, timeout=None):
+        """
+        Wait for a frame newer than the last one returned.
+
+        Returns (ok, frame, timestamp); ok is False once the camera
+        stopped delivering (or on timeout).
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._index > self._read_index or self._ended, timeout)
+            if self._index == self._read_index:
+                return False, None, None
+            self._read_index = self._index
+            frame, stamp = self._frame, self._stamp
+            self._frame = None
+
+        self.stats["delivered"] += 1
+        self.stats["age_ms"] = (time.time() - stamp) * 1000.0
+        return True, frame, stamp
+
+    def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.cap.release()
@@ -0,0 +1,328 @@
+"""
+editor.py
+---------
+Gesture editor state machine (BUILD / SCALE / GROUP / EXTRUDE, fist move).
+
+Used by:
+- phase6_1_final_selection.py (live camera loop)
+- phase6_editor/replay.py (headless replay and timing)
+
+Editor.step(landmarks, t) advances the interaction by one frame from
+the hands' landmarks and the frame time, editing the scene through
+data/scene_data.py and data/history.py. It does no capture and no
+drawing: what the view needs (cursor, hovered menu item, hold-progress
+rings, blueprint cells, commit feedback) is left on the editor for the
+caller to render. Nothing here needs a camera, a window or MediaPipe.
+"""
+
+from data.history import History
+from data.scene_data import (
+    structures,
+    structure_heights,
+    get_active_index,
+    set_active_structure,
+    add_structure,
+    move_structure,
+    set_structure_height,
+    get_structure_at_cell,
+    auto_merge_structures,
+)
+from phase6_editor.gestures import GestureRecognizer
+
+# ================== GRID & MODES ==================
+GRID_SIZE = 40
+MODES = ["BUILD", "SCALE", "GROUP", "EXTRUDE"]
+
+# ================== MENU UI ==================
+MENU_X = 20
+MENU_Y = 80
+MENU_W = 160
+MENU_H = 50
+
+# ================== TIMING ==================
+DRAW_HOLD_TIME = 0.5
+MAX_HEIGHT = 20
+EXTRUDE_STEP_PX = 10
+COMMIT_DISPLAY_TIME = 0.5  # seconds
+
+
+# ================== HELPERS ==================
+
+def rect_cells(a, b):
+    x1, y1 = a
+    x2, y2 = b
+    return {(x, y) for x in range(min(x1, x2), max(x1, x2) + 1)
+                    for y in range(min(y1, y2), max(y1, y2) + 1)}
+
+def rect_outline_cells(a, b):
+    x1, y1 = a
+    x2, y2 = b
+    cells = set()
+    for x in range(min(x1, x2), max(x1, x2) + 1):
+        cells.add((x, y1))
+        cells.add((x, y2))
+    for y in range(min(y1, y2), max(y1, y2) + 1):
+        cells.add((x1, y))
+        cells.add((x2, y))
+    return cells
+
+def has_valid_active_structure():
+    idx = get_active_index()
+    return idx is not None and 0 <= idx < len(structures)
+
+
+# ================== EDITOR ==================
+
+class Editor:
+    def __init__(self, width, height, history=None, publish=None, recognizer=None):
+        """
+        :param width, height: view size in pixels (landmarks are normalized)
+        :param history: data.history.History receiving the undo steps
+        :param publish: called after every committed edit (e.g. journal flush)
+        :param recognizer: GestureRecognizer used by step()
+        """
+        self.width = width
+        self.height = height
+        self.history = history if history is not None else History()
+        self.publish = publish if publish is not None else (lambda: None)
+        self.recognizer = recognizer if recognizer is not None else GestureRecognizer()
+
+        self.mode = "BUILD"
+
+        # Phase A: blueprint drag
+        self.hold_start = None
+        self.blueprint_active = False
+        self.blueprint_start_cell = None
+        self.blueprint_cells = set()
+        self.blueprint_outline = set()
+        self.blueprint_axis = None
+
+        # Phase B / C: extrude
+        self.last_extrude_y = None
+        self.ghost_height = None
+        self.show_height_hud = False
+
+        # Phase D.1: two-hand lock, fist move
+        self.two_hand_hold_start = None
+        self.two_hand_ready = False
+        self.editor_locked = False
+
+        self.fist_hold_start = None
+        self.fist_locked = False
+        self.fist_move_active = False
+        self.move_anchor_hand = None
+        self.move_offset = (0, 0)
+
+        self.last_pinch = False
+        self.group_select_locked = False
+
+        # Commit feedback
+        self.commit_message = None
+        self.commit_time = 0
+
+        # Per-frame view state, rebuilt by every step()
+        self.gestures = None
+        self.cursor = None          # (ix, iy) pixels, None without a hand
+        self.cursor_cell = None
+        self.hovered_index = None
+        self.rings = []             # hold progress: ((x, y), radius, progress, thickness)
+
+        self.steps = 0
+
+    # ---------- feedback ----------
+
+    def trigger_commit(self, msg, t):
+        self.commit_message = msg
+        self.commit_time = t
+
+    def feedback(self, t):
+        """Commit message to show at time t, or None."""
+        if self.commit_message and t - self.commit_time >= COMMIT_DISPLAY_TIME:
+            self.commit_message = None
+        return self.commit_message
+
+    def _hold(self, start, t, center, radius, thickness):
+        progress = min((t - start) / DRAW_HOLD_TIME, 1)
+        self.rings.append((center, radius, progress, thickness))
+        return progress
+
+    # ---------- undo / redo ----------
+
+    def undo(self):
+        if self.history.can_undo():
+            self.history.undo()
+            self.publish()
+
+    def redo(self):
+        if self.history.can_redo():
+            self.history.redo()
+            self.publish()
+
+    # ---------- frame step ----------
+
+    def step(self, landmarks, t):
+        """
+        Advance one frame.
+
+        :param landmarks: (hands, 21, 3) normalized landmarks, hands[0] primary
+        :param t: frame time in seconds
+        :return: the frame's GestureState
+        """
+        return self.step_gestures(self.recognizer.process_points(landmarks), t)
+
+    def step_gestures(self, gestures, t):
+        """Advance one frame from an already classified GestureState."""
+        self.steps += 1
+        self.gestures = gestures
+        self.hovered_index = None
+        self.cursor = None
+        self.cursor_cell = None
+        self.rings = []
+
+        if not gestures.hands:
+            return gestures
+
+        # ===== TWO HAND READY =====
+        open_hands = gestures.open_hands
+        pinch_seen = gestures.pinch_seen
+
+        if open_hands == 2 and not pinch_seen and not self.two_hand_ready:
+            if self.two_hand_hold_start is None:
+                self.two_hand_hold_start = t
+            center = (self.width // 2, self.height // 2)
+            # Lock editor
+            if self._hold(self.two_hand_hold_start, t, center, 40, 3) >= 1:
+                self.two_hand_ready = True
+                self.editor_locked = True
+        else:
+            # Unlock editor
+            self.two_hand_hold_start = None
+            if self.two_hand_ready and open_hands < 2:
+                self.two_hand_ready = False
+                self.editor_locked = False
+
+        # ===== PRIMARY HAND =====
+        hand = gestures.primary
+        open_hand = hand.open_hand
+        pinch = hand.pinch
+        fist = hand.fist
+
+        ix, iy = int(hand.cursor[0] * self.width), int(hand.cursor[1] * self.height)
+        cursor_cell = (ix // GRID_SIZE, iy // GRID_SIZE)
+        self.cursor = (ix, iy)
+        self.cursor_cell = cursor_cell
+
+        # ===== GROUP MODE: STRUCTURE SELECTION =====
+        if self.mode == "GROUP":
+            if pinch and not self.group_select_locked:
+                hit = get_structure_at_cell(cursor_cell)
+                if hit is not None:
+                    set_active_structure(hit)
+                    self.group_select_locked = True
+            if not pinch:
+                self.group_select_locked = False
+
+        # ===== FIST MOVE WITH LOADER =====
+        if fist and not self.blueprint_active and has_valid_active_structure() and not self.editor_locked:
+            if not self.fist_locked:
+                if self.fist_hold_start is None:
+                    self.fist_hold_start = t
+                if self._hold(self.fist_hold_start, t, (ix, iy), 28, 2) >= 1:
+                    # MOVE UNDO (whole drag is one step)
+                    self.history.begin("MOVE")
+                    self.fist_locked = True
+                    self.fist_move_active = True
+                    self.move_anchor_hand = cursor_cell
+                    self.move_offset = (0, 0)
+            else:
+                dx = cursor_cell[0] - self.move_anchor_hand[0]
+                dy = cursor_cell[1] - self.move_anchor_hand[1]
+                # Shift by the change since last frame (no per-cell rebuild)
+                if (dx, dy) != self.move_offset:
+                    move_structure(get_active_index(),
+                                   dx - self.move_offset[0], dy - self.move_offset[1])
+                    self.move_offset = (dx, dy)
+        else:
+            # FIST RELEASE UNDO
+            if self.fist_move_active:
+                self.history.commit()
+                self.publish()
+                self.trigger_commit("MOVE OK", t)
+            self.fist_hold_start = None
+            self.fist_locked = False
+            self.fist_move_active = False
+
+        # ===== MENU =====
+        for i, m in enumerate(MODES):
+            y = MENU_Y + i * MENU_H
+            if MENU_X < ix < MENU_X + MENU_W and y < iy < y + MENU_H:
+                self.hovered_index = i
+
+        if pinch and self.hovered_index is not None and not self.last_pinch:
+            self.mode = MODES[self.hovered_index]
+            self.last_pinch = True
+        if not pinch:
+            self.last_pinch = False
+
+        # ===== BUILD =====
+        if self.mode == "BUILD" and not self.two_hand_ready:
+            if pinch and not self.blueprint_active:
+                if self.hold_start is None:
+                    self.hold_start = t
+                if self._hold(self.hold_start, t, (ix, iy), 28, 2) >= 1:
+                    self.blueprint_active = True
+                    self.blueprint_start_cell = cursor_cell
+                    self.blueprint_axis = None
+
+            elif self.blueprint_active and pinch:
+                sx, sy = self.blueprint_start_cell
+                cx, cy = cursor_cell
+                self.blueprint_axis = "H" if abs(cx - sx) >= abs(cy - sy) else "V"
+                end = (cx, sy) if self.blueprint_axis == "H" else (sx, cy)
+                self.blueprint_cells = rect_cells(self.blueprint_start_cell, end)
+                self.blueprint_outline = rect_outline_cells(self.blueprint_start_cell, end)
+
+            elif self.blueprint_active and open_hand and not self.editor_locked:
+                # BUILD COMMIT UNDO
+                self.history.begin("BUILD")
+                add_structure(self.blueprint_cells, 1.0, 1)
+                # Only the new footprint's neighbours are checked
+                merged_idx = auto_merge_structures([len(structures) - 1])[0]
+                set_active_structure(merged_idx)
+                self.history.commit()
+                self.publish()
+                self.trigger_commit("BUILD OK", t)
+                self.blueprint_active = False
+                self.blueprint_cells.clear()
+                self.blueprint_outline.clear()
+                self.hold_start = None
+
+            if not pinch:
+                self.hold_start = None
+
+        # ===== EXTRUDE =====
+        if self.mode == "EXTRUDE" and has_valid_active_structure() and not self.editor_locked:
+            idx = get_active_index()
+            if pinch:
+                self.show_height_hud = True
+                if self.last_extrude_y is None:
+                    # EXTRUDE UNDO (whole drag is one step)
+                    self.history.begin("EXTRUDE")
+                    self.last_extrude_y = iy
+                    self.ghost_height = structure_heights[idx]
+                if abs(self.last_extrude_y - iy) > EXTRUDE_STEP_PX:
+                    set_structure_height(idx, max(1, min(MAX_HEIGHT,
+                        self.ghost_height + (1 if iy < self.last_extrude_y else -1))))
+                    self.ghost_height = structure_heights[idx]
+                    self.last_extrude_y = iy
+            else:
+                # EXTRUDE RELEASE UNDO
+                if self.last_extrude_y is not None:
+                    self.history.commit()
+                    self.publish()
+                    self.trigger_commit("EXTRUDE OK", t)
+                self.last_extrude_y = None
+                self.ghost_height = None
+                self.show_height_hud = False
+
+        return gestures
@@ -0,0 +1,199 @@
+"""
+gestures.py
+-----------
+Hand gesture recognition for the gesture editor.
+
+Used by:
+- phase6_1_final_selection.py
+
+Each detected hand's 21 MediaPipe landmarks are copied into one
+(hands, 21, 3) NumPy array per frame. All features (pinch distance,
+finger extension, palm normal) are computed for every hand at once,
+then a classifier turns them into gesture flags. The result is a
+GestureState the main loop reads instead of poking at landmarks.
+
+The classifier is pluggable: anything with classify(features) ->
+{"open_hand", "pinch", "fist"} bool arrays works. ThresholdClassifier
+reproduces the editor's hand-tuned rules; ModelClassifier wraps a
+trained model with a predict(X) method (e.g. scikit-learn) fed by
+feature_matrix().
+"""
+
+import numpy as np
+
+# ================== LANDMARKS ==================
+
+WRIST = 0
+THUMB_TIP = 4
+INDEX_MCP = 5
+INDEX_TIP = 8
+PINKY_MCP = 17
+
+# Tip / PIP joint pairs of the four fingers (index, middle, ring, pinky)
+FINGER_TIPS = np.array([8, 12, 16, 20])
+FINGER_PIPS = np.array([6, 10, 14, 18])
+
+NUM_LANDMARKS = 21
+
+# Thumb-index distance (normalized image units) that counts as a pinch
+PINCH_THRESHOLD = 0.05
+
+
+def landmarks_array(multi_hand_landmarks):
+    """MediaPipe hand landmarks -> (hands, 21, 3) float array."""
+    if not multi_hand_landmarks:
+        return np.zeros((0, NUM_LANDMARKS, 3))
+    return np.array(
+        [[(p.x, p.y, p.z) for p in hand.landmark] for hand in multi_hand_landmarks],
+        dtype=np.float64,
+    ).reshape(-1, NUM_LANDMARKS, 3)
+
+
+# ================== FEATURES ==================
+
+def hand_features(points):
+    """
+    Features of every hand in one pass.
+
+    :param points: (hands, 21, 3) landmark array
+    :return: dict of arrays with a leading hands axis:
+             pinch_distance (H,), extended (H, 4) bool,
+             palm_normal (H, 3) unit vector, cursor (H, 2) index tip x, y
+    """
+    thumb_index = points[:, THUMB_TIP, :2] - points[:, INDEX_TIP, :2]
+
+    # Image y grows downward: a finger is up when its tip is above its PIP
+    extended = points[:, FINGER_TIPS, 1] < points[:, FINGER_PIPS, 1]
+
+    across = points[:, PINKY_MCP] - points[:, WRIST]
+    up = points[:, INDEX_MCP] - points[:, WRIST]
+    normal = np.cross(up, across)
+    length = np.linalg.norm(normal, axis=1, keepdims=True)
+    normal = np.divide(normal, length, out=np.zeros_like(normal), where=length > 0)
+
+    return {
+        "pinch_distance": np.hypot(thumb_index[:, 0], thumb_index[:, 1]),
+        "extended": extended,
+        "palm_normal": normal,
+        "cursor": points[:, INDEX_TIP, :2],
+    }
+
+
+def feature_matrix(features):
+    """Flatten features into an (H, 8) matrix for data-driven classifiers."""
+    return np.column_stack([
+        features["pinch_distance"],
+        features["extended"].astype(np.float64),
+        features["palm_normal"],
+    ])
+
+
+# ================== CLASSIFIERS ==================
+
+class ThresholdClassifier:
+    """The editor's original rules: finger extension and a pinch threshold."""
+
+    def __init__(self, pinch_threshold=PINCH_THRESHOLD):
+        self.pinch_threshold = pinch_threshold
+
+    def classify(self, features):
+        extended = features["extended"]
+        return {
+            "open_hand": extended.all(axis=1),
+            "pinch": features["pinch_distance"] < self.pinch_threshold,
+            "fist": ~extended.any(axis=1),
+        }
+
+
+class ModelClassifier:
+    """
+    Adapter for a trained model with predict(X) -> one label per hand.
+
+    Labels are mapped to gesture flags through label_flags, e.g.
+    {"open": "open_hand", "pinch": "pinch", "fist": "fist"}; unknown
+    labels set no flag.
+    """
+
+    def __init__(self, model, label_flags):
+        self.model = model
+        self.label_flags = dict(label_flags)
+
+    def classify(self, features):
+        n = len(features["pinch_distance"])
+        flags = {name: np.zeros(n, dtype=bool) for name in ("open_hand", "pinch", "fist")}
+        if n:
+            for i, label in enumerate(self.model.predict(feature_matrix(features))):
+                name = self.label_flags.get(label)
+                if name is not None:
+                    flags[name][i] = True
+        return flags
+
+
+# ================== RESULT ==================
+
+class HandGesture:
+    """Gesture state of one detected hand."""
+
+    __slots__ = ("points", "pinch_distance", "extended", "palm_normal",
+                 "cursor", "open_hand", "pinch", "fist")
+
+    def __init__(self, points, pinch_distance, extended, palm_normal,
+                 cursor, open_hand, pinch, fist):
+        self.points = points                  # (21, 3) landmarks
+        self.pinch_distance = pinch_distance  # float
+        self.extended = extended              # (4,) bool, index..pinky
+        self.palm_normal = palm_normal        # (3,) unit vector
+        self.cursor = cursor                  # (x, y) normalized index tip
+        self.open_hand = open_hand
+        self.pinch = pinch
+        self.fist = fist
+
+
+class GestureState:
+    """Gestures of all hands in one frame; hands[0] is the primary hand."""
+
+    __slots__ = ("hands",)
+
+    def __init__(self, hands):
+        self.hands = hands
+
+    @property
+    def primary(self):
+        return self.hands[0] if self.hands else None
+
+    @property
+    def open_hands(self):
+        return sum(1 for hand in self.hands if hand.open_hand)
+
+    @property
+    def pinch_seen(self):
+        return any(hand.pinch for hand in self.hands)
+
+
+class GestureRecognizer:
+    def __init__(self, classifier=None):
+        self.classifier = classifier if classifier is not None else ThresholdClassifier()
+
+    def process_points(self, points):
+        """(hands, 21, 3) landmark array -> GestureState."""
+        features = hand_features(points)
+        flags = self.classifier.classify(features)
+
+        hands = []
+        for i in range(len(points)):
+            cx, cy = features["cursor"][i].tolist()
+            hands.append(HandGesture(
+                points[i],
+                float(features["pinch_distance"][i]),
+                features["extended"][i],
+                features["palm_normal"][i],
+                (cx, cy),
+                bool(flags["open_hand"][i]),
+                bool(flags["pinch"][i]),
+                bool(flags["fist"][i]),
+            ))
+        return GestureState(hands)
+
+    def process(self, multi_hand_landmarks):
+        """MediaPipe multi_hand_landmarks (or None) -> GestureState."""
+        return self.process_points(landmarks_array(multi_hand_landmarks))
@@ -0,0 +1,86 @@
+"""
+overlay.py
+----------
+Pre-rendered static layers for the gesture editor (grid, mode menu).
+
+Used by:
+- phase6_1_final_selection.py
+
+A layer is drawn once into a BGRA canvas by its draw function and kept
+cropped to the box it covers. Compositing is one masked copy of the
+opaque pixels (cv2.copyTo) plus a blend of the few partly transparent
+ones left by anti-aliased text, so the per-frame cost no longer depends
+on how many lines or labels it took to draw the layer. The layer is
+redrawn only when its key (frame size plus whatever state the caller
+passes) changes.
+"""
+
+import cv2
+import numpy as np
+
+
+def opaque(color):
+    """BGR color -> BGRA color for drawing on a layer canvas."""
+    return tuple(color) + (255,)
+
+
+class OverlayLayer:
+    def __init__(self, draw):
+        """
+        :param draw: draw(canvas, *state) paints onto an (h, w, 4) uint8
+                     canvas with opaque() colors
+        """
+        self.draw = draw
+        self.key = None
+        self.box = None          # (y0, y1, x0, x1) covered by the layer; None = empty
+        self.color = None        # BGR pixels inside the box
+        self.mask = None         # fully opaque pixels inside the box
+        self.edge_at = None      # (rows, cols) in the box of partly transparent pixels
+        self.edge_color = None   # (K, 3) premultiplied BGR of those pixels
+        self.edge_keep = None    # (K, 1) share of the frame kept under them
+        self.rebuilds = 0
+
+    def _build(self, shape, state):
+        h, w = shape[:2]
+        canvas = np.zeros((h, w, 4), dtype=np.uint8)
+        self.draw(canvas, *state)
+        self.rebuilds += 1
+
+        alpha = canvas[:, :, 3]
+        rows = np.flatnonzero(alpha.any(axis=1))
+        cols = np.flatnonzero(alpha.any(axis=0))
+        if len(rows) == 0:
+            self.box = None
+            return
+
+        y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        self.box = (y0, y1, x0, x1)
+        crop = canvas[y0:y1, x0:x1]
+        alpha = crop[:, :, 3]
+
+        # Anti-aliased drawing on a transparent canvas leaves color
+        # premultiplied by alpha, so opaque pixels copy straight over
+        # and edge pixels blend as color + frame * (1 - alpha).
+        self.color = np.ascontiguousarray(crop[:, :, :3])
+        self.mask = (alpha == 255).astype(np.uint8)
+
+        self.edge_at = np.nonzero((alpha > 0) & (alpha < 255))
+        self.edge_color = self.color[self.edge_at].astype(np.float32)
+        self.edge_keep = (255 - alpha[self.edge_at][:, None]) / np.float32(255)
+
+    def composite(self, frame, *state):
+        """Paint the layer onto a BGR frame in place, rebuilding it if needed."""
+        key = (frame.shape, state)
+        if key != self.key:
+            self._build(frame.shape, state)
+            self.key = key
+        if self.box is None:
+            return
+
+        y0, y1, x0, x1 = self.box
+        region = frame[y0:y1, x0:x1]
+        cv2.copyTo(self.color, self.mask, region)
+
+        if len(self.edge_color):
+            under = region[self.edge_at]
+            region[self.edge_at] = (self.edge_color + under * self.edge_keep + 0.5).astype(np.uint8)
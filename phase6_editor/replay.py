@@ -0,0 +1,279 @@
+"""
+replay.py
+---------
+Landmark recordings and a headless replay driver for the gesture editor.
+
+Used by:
+- phase6_1_final_selection.py (recording with AIRBLOCKS_RECORD=<path>)
+- performance checks: python -m phase6_editor.replay [recording] [--json]
+
+A recording stores, per frame, the frame time and the landmarks of
+every detected hand. replay() feeds them through a fresh Editor as fast
+as it can and times each step() on its own, so the cost of the
+interaction logic can be measured and compared without a camera,
+MediaPipe or a window. synthetic_recording() scripts a build / extrude /
+move / select session for machines without a recorded file (CI).
+
+File layout (little-endian, version 1):
+
+    header : magic "ABLM", version u16, flags u16,
+             width u32, height u32, frame count u32
+    times  : frame count x f64
+    hands  : frame count x u8 (hands per frame)
+    points : total hands x 21 x 3 f32 (normalized x, y, z)
+"""
+
+import argparse
+import json
+import struct
+import sys
+import time
+
+import numpy as np
+
+from data import scene_data
+from data.history import History
+from phase6_editor.editor import Editor, GRID_SIZE, MENU_X, MENU_Y, MENU_W, MENU_H, MODES
+from phase6_editor.gestures import NUM_LANDMARKS
+
+MAGIC = b"ABLM"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIII")
+
+
+class RecordingFormatError(ValueError):
+    pass
+
+
+# ================== RECORDING ==================
+
+class Recording:
+    def __init__(self, width, height, times, counts, points):
+        self.width = width
+        self.height = height
+        self.times = np.asarray(times, dtype=np.float64)
+        self.counts = np.asarray(counts, dtype=np.uint8)
+        self.points = np.asarray(points, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3)
+        self.offsets = np.r_[0, np.cumsum(self.counts, dtype=np.int64)]
+
+    def __len__(self):
+        return len(self.times)
+
+    def frames(self):
+        """Yield (t, (hands, 21, 3) landmarks) per frame."""
+        for i, t in enumerate(self.times.tolist()):
+            yield t, self.points[self.offsets[i]:self.offsets[i + 1]]
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, self.width, self.height, len(self)))
+            f.write(self.times.astype("<f8").tobytes())
+            f.write(self.counts.tobytes())
+            f.write(self.points.astype("<f4").tobytes())
+
+
+def load_recording(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise RecordingFormatError("truncated header")
+
+    magic, version, _flags, width, height, n = HEADER.unpack_from(data)
+    if magic != MAGIC or version > VERSION:
+        raise RecordingFormatError(f"not a landmark recording (v{VERSION})")
+
+    pos = HEADER.size
+    times = np.frombuffer(data, "<f8", n, pos)
+    pos += 8 * n
+    counts = np.frombuffer(data, np.uint8, n, pos)
+    pos += n
+    total = int(counts.sum()) * NUM_LANDMARKS * 3
+    if len(data) < pos + 4 * total:
+        raise RecordingFormatError("truncated landmark data")
+    points = np.frombuffer(data, "<f4", total, pos)
+    return Recording(width, height, times, counts, points)
+
+
+class LandmarkRecorder:
+    """Collects the landmarks the editor saw, frame by frame."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.times = []
+        self.counts = []
+        self.points = []
+
+    def add(self, t, landmarks):
+        landmarks = np.asarray(landmarks, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3)
+        self.times.append(t)
+        self.counts.append(len(landmarks))
+        self.points.append(landmarks)
+
+    def recording(self):
+        points = np.concatenate(self.points) if self.points else np.zeros((0, NUM_LANDMARKS, 3))
+        return Recording(self.width, self.height, self.times, self.counts, points)
+
+    def save(self, path):
+        self.recording().save(path)
+
+
+# ================== SYNTHETIC SESSION ==================
+
+def hand_pose(x, y, gesture):
+    """
+    (21, 3) landmarks of a right hand with its index tip at (x, y).
+
+    gesture: "point" (index up), "pinch", "open" (all fingers up) or "fist".
+    """
+    p = np.zeros((NUM_LANDMARKS, 3))
+    p[0] = (x, y + 0.25, 0)
+
+    # Thumb: CMC, MCP, IP, tip (tip next to the index tip when pinching)
+    p[1:4] = [(x - 0.06, y + 0.20, 0), (x - 0.08, y + 0.15, 0), (x - 0.09, y + 0.10, 0)]
+    p[4] = (x + 0.01, y, 0) if gesture == "pinch" else (x - 0.12, y + 0.08, 0)
+
+    for f in range(4):
+        fx = x + 0.03 * f
+        up = gesture == "open" or (f == 0 and gesture in ("point", "pinch"))
+        tip_y = y if f == 0 else (y if up else y + 0.10)
+        pip_y = tip_y + 0.06 if up else tip_y - 0.04
+        base = 5 + 4 * f
+        p[base] = (fx, y + 0.12, 0)                      # MCP
+        p[base + 1] = (fx, pip_y, 0)                     # PIP
+        p[base + 2] = (fx, (pip_y + tip_y) / 2, 0)       # DIP
+        p[base + 3] = (fx, tip_y, 0)                     # tip
+    return p
+
+
+def synthetic_recording(structures=8, fps=30, width=1920, height=1080, seed=0):
+    """
+    Scripted session: build `structures` bars, extrude the last one,
+    fist-move it, select the first in GROUP mode, return to BUILD.
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / fps
+    rec = LandmarkRecorder(width, height)
+    state = {"t": 0.0, "at": (width / 2, height / 2)}
+
+    def cell_px(cell):
+        return ((cell[0] + 0.5) * GRID_SIZE, (cell[1] + 0.5) * GRID_SIZE)
+
+    def menu_px(i):
+        return (MENU_X + MENU_W / 2, MENU_Y + i * MENU_H + MENU_H / 2)
+
+    def move(gesture, to, seconds):
+        (x0, y0), (x1, y1) = state["at"], to
+        n = max(1, int(round(seconds * fps)))
+        for k in range(1, n + 1):
+            a = k / n
+            x, y = x0 + (x1 - x0) * a, y0 + (y1 - y0) * a
+            pose = hand_pose(x / width, y / height, gesture)
+            rec.add(state["t"], pose + rng.normal(0, 0.0005, pose.shape))
+            state["t"] += dt
+        state["at"] = to
+
+    def hold(gesture, seconds):
+        move(gesture, state["at"], seconds)
+
+    def pick_mode(name):
+        move("point", menu_px(MODES.index(name)), 0.3)
+        hold("pinch", 0.1)
+        hold("point", 0.1)
+
+    cols = max(1, (width // GRID_SIZE - 8) // 5)
+    starts = [(8 + (k % cols) * 5, 3 + (k // cols) * 3) for k in range(structures)]
+
+    for start in starts:
+        move("point", cell_px(start), 0.2)
+        hold("pinch", 0.6)                               # blueprint hold
+        move("pinch", cell_px((start[0] + 3, start[1])), 0.4)
+        hold("open", 0.1)                                # commit
+        hold("point", 0.1)
+
+    last = starts[-1]
+    pick_mode("EXTRUDE")
+    move("point", cell_px(last), 0.3)
+    move("pinch", (state["at"][0], state["at"][1] - 8 * 12), 0.6)
+    hold("point", 0.1)
+
+    hold("fist", 0.6)                                    # move hold
+    move("fist", (state["at"][0], state["at"][1] + GRID_SIZE), 0.3)
+    hold("point", 0.1)
+
+    pick_mode("GROUP")
+    move("point", cell_px(starts[0]), 0.3)
+    hold("pinch", 0.1)
+    hold("point", 0.1)
+    pick_mode("BUILD")
+    return rec.recording()
+
+
+# ================== REPLAY ==================
+
+def replay(recording, editor=None, reset_scene=True):
+    """
+    Run every frame through Editor.step() as fast as possible.
+
+    Returns timing stats (per-step microseconds) and the end state.
+    """
+    if reset_scene:
+        scene_data.replace_scene([], [], [])
+    if editor is None:
+        editor = Editor(recording.width, recording.height, History())
+
+    step_ns = np.empty(len(recording), dtype=np.int64)
+    clock = time.perf_counter_ns
+    start = clock()
+    for i, (t, landmarks) in enumerate(recording.frames()):
+        t0 = clock()
+        editor.step(landmarks, t)
+        step_ns[i] = clock() - t0
+    total = (clock() - start) / 1e9
+
+    us = step_ns / 1e3
+    summary = scene_data.scene_summary()
+    return {
+        "frames": len(recording),
+        "seconds": total,
+        "fps": len(recording) / total if total > 0 else 0.0,
+        "mean_us": float(us.mean()) if len(us) else 0.0,
+        "p50_us": float(np.percentile(us, 50)) if len(us) else 0.0,
+        "p95_us": float(np.percentile(us, 95)) if len(us) else 0.0,
+        "p99_us": float(np.percentile(us, 99)) if len(us) else 0.0,
+        "max_us": float(us.max()) if len(us) else 0.0,
+        "structures": summary["structures"],
+        "blocks": summary["blocks"],
+        "mode": editor.mode,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a landmark recording through the editor.")
+    parser.add_argument("recording", nargs="?", help="recorded .ablm file (default: synthetic session)")
+    parser.add_argument("--structures", type=int, default=8, help="bars in the synthetic session")
+    parser.add_argument("--save", help="write the synthetic session to this path")
+    parser.add_argument("--json", action="store_true", help="print stats as JSON")
+    args = parser.parse_args(argv)
+
+    if args.recording:
+        rec = load_recording(args.recording)
+    else:
+        rec = synthetic_recording(args.structures)
+        if args.save:
+            rec.save(args.save)
+
+    stats = replay(rec)
+    if args.json:
+        json.dump(stats, sys.stdout, indent=2)
+        print()
+    else:
+        print(f"{stats['frames']} frames in {stats['seconds']:.3f}s ({stats['fps']:.0f} fps)")
+        print(f"step: mean {stats['mean_us']:.1f}us  p95 {stats['p95_us']:.1f}us  "
+              f"max {stats['max_us']:.1f}us")
+        print(f"scene: {stats['structures']} structures, {stats['blocks']} blocks, mode {stats['mode']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+structure_raster.py
+-------------------
+Cached 2D rasters of the structures in the gesture editor view.
+
+Used by:
+- phase6_1_final_selection.py
+
+Every block of every level is drawn with the same small "stamp"
+(fill, 1 px edge, and the active outline ring when the structure is
+selected). The stamp is drawn once with cv2 to get its exact pixels.
+A structure is then rasterized with NumPy and a few rectangular
+dilations instead of one cv2.rectangle per block per level:
+
+- each stamp is seeded into a rank image at its top-left corner, the
+  rank being its position in the old draw order (level, then cell);
+- dilating the seeds by the stamp footprint gives, per pixel, the
+  last stamp drawn over it, i.e. the painter's-order winner;
+- the pixel takes that stamp's color at its offset inside the stamp.
+
+The raster is keyed by (structure version, height, scale, active) and
+rebuilt only when one of them changes. Drawing a frame is one masked
+cv2.copyTo per structure, in scene order.
+"""
+
+import cv2
+import numpy as np
+
+from data import scene_data
+
+
+def _stamp(size, fill_color, edge_color, active_color):
+    """
+    Pixels of one block at origin (0, 0).
+
+    Returns (colors (h, w, 3), footprint (h, w) bool, (oy, ox)) where
+    (oy, ox) is the block origin inside the stamp.
+    """
+    margin = 4
+    side = size + 1 + 2 * margin
+    colors = np.zeros((side, side, 3), dtype=np.uint8)
+    covered = np.zeros((side, side), dtype=np.uint8)
+
+    p0, p1 = (margin, margin), (margin + size, margin + size)
+    for canvas, fill, edge in ((colors, fill_color, edge_color), (covered, 1, 1)):
+        cv2.rectangle(canvas, p0, p1, fill, -1)
+        cv2.rectangle(canvas, p0, p1, edge, 1)
+        if active_color is not None:
+            ring = active_color if canvas is colors else 1
+            cv2.rectangle(canvas, (p0[0] - 2, p0[1] - 2), (p1[0] + 2, p1[1] + 2), ring, 2)
+
+    rows = np.flatnonzero(covered.any(axis=1))
+    cols = np.flatnonzero(covered.any(axis=0))
+    y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    return colors[y0:y1, x0:x1], covered[y0:y1, x0:x1] > 0, (margin - y0, margin - x0)
+
+
+def _row_bands(footprint):
+    """Split a footprint into rectangles (r0, r1, c0, c1) of rows with equal spans."""
+    bands = []
+    for r, row in enumerate(footprint):
+        cols = np.flatnonzero(row)
+        span = (cols[0], cols[-1] + 1)
+        if bands and bands[-1][1] == r and bands[-1][2:] == span:
+            bands[-1] = (bands[-1][0], r + 1) + span
+        else:
+            bands.append((r, r + 1) + span)
+    return bands
+
+
+def rasterize(origins, stamp):
+    """
+    Paint stamps at origins in order, later ones on top.
+
+    :param origins: (N, 2) int array of block origins (x, y) in draw order
+    :param stamp: result of _stamp()
+    :return: ((top, left), colors (H, W, 3), mask (H, W) uint8)
+    """
+    colors, footprint, (oy, ox) = stamp
+    sh, sw = footprint.shape
+
+    corners = origins - (ox, oy)
+    lo = corners.min(axis=0)
+    seed_x, seed_y = (corners - lo).T
+    H = int(seed_y.max()) + sh
+    W = int(seed_x.max()) + sw
+
+    # Rank 1..N at each stamp's corner; equal corners keep the later rank
+    seeds = np.zeros((H, W), dtype=np.float32)
+    np.maximum.at(seeds, (seed_y, seed_x), np.arange(1, len(origins) + 1, dtype=np.float32))
+
+    # winner[p] = max rank of the stamps covering p
+    winner = np.zeros_like(seeds)
+    for r0, r1, c0, c1 in _row_bands(footprint):
+        kh, kw = r1 - r0, c1 - c0
+        grown = cv2.dilate(
+            seeds, np.ones((kh, kw), np.uint8), anchor=(kw - 1, kh - 1),
+            borderType=cv2.BORDER_CONSTANT, borderValue=0,
+        )
+        np.maximum(winner[r0:, c0:], grown[:H - r0, :W - c0], out=winner[r0:, c0:])
+
+    # Offset of every pixel inside its winning stamp; rank 0 (uncovered)
+    # maps to a dummy corner and is masked out below.
+    rank = winner.astype(np.int32)
+    corner_y = np.r_[0, seed_y].astype(np.int32)
+    corner_x = np.r_[0, seed_x].astype(np.int32)
+    offset = (np.arange(H, dtype=np.int32)[:, None] - corner_y[rank]) * sw
+    offset += np.arange(W, dtype=np.int32)[None, :] - corner_x[rank]
+    np.clip(offset, 0, sh * sw - 1, out=offset)
+
+    # Gather BGR as packed uint32 words: one lookup per pixel, not three
+    packed = np.zeros((sh * sw, 4), dtype=np.uint8)
+    packed[:, :3] = colors.reshape(-1, 3)
+    image = packed.view(np.uint32).reshape(-1)[offset]
+    image = cv2.cvtColor(image.view(np.uint8).reshape(H, W, 4), cv2.COLOR_BGRA2BGR)
+    mask = (rank > 0).astype(np.uint8)
+    return (int(lo[1]), int(lo[0])), image, mask
+
+
+class StructureRasterCache:
+    def __init__(self, grid_size, fill_color, edge_color, active_color):
+        self.grid_size = grid_size
+        self.colors = (fill_color, edge_color, active_color)
+        self.stamps = {}        # (size, active) -> stamp
+        self.rasters = {}       # sid -> (key, rasterize() result or None when empty)
+        self.rebuilds = 0
+
+    def _stamp(self, size, active):
+        stamp = self.stamps.get((size, active))
+        if stamp is None:
+            fill, edge, ring = self.colors
+            stamp = self.stamps[(size, active)] = _stamp(size, fill, edge, ring if active else None)
+        return stamp
+
+    def _build(self, index, active):
+        g = self.grid_size
+        size = int(g * scene_data.structure_scales[index])
+        height = scene_data.structure_heights[index]
+
+        # Pixel origins for the whole footprint, level by level (old draw order)
+        base = scene_data.structure_cells(index) * g + (g - size) // 2
+        if len(base) == 0 or height < 1:
+            return None
+        levels = np.arange(height)[:, None, None] * np.array([0, -(g // 2)])
+        origins = (base[None, :, :] + levels).reshape(-1, 2)
+
+        self.rebuilds += 1
+        return rasterize(origins, self._stamp(size, active))
+
+    def sync(self, active_idx):
+        """Rebuild rasters whose structure, height, scale or selection changed."""
+        live = set()
+        for i, sid in enumerate(scene_data.structure_ids):
+            live.add(sid)
+            key = (
+                scene_data.get_structure_version(i),
+                scene_data.structure_heights[i],
+                scene_data.structure_scales[i],
+                i == active_idx,
+            )
+            cached = self.rasters.get(sid)
+            if cached is None or cached[0] != key:
+                self.rasters[sid] = (key, self._build(i, key[3]))
+
+        for sid in [sid for sid in self.rasters if sid not in live]:
+            del self.rasters[sid]
+
+    def draw(self, frame, active_idx):
+        """Blit every structure onto the frame in scene order."""
+        self.sync(active_idx)
+        h, w = frame.shape[:2]
+
+        for sid in scene_data.structure_ids:
+            raster = self.rasters[sid][1]
+            if raster is None:
+                continue
+            (top, left), image, mask = raster
+            y0, x0 = max(top, 0), max(left, 0)
+            y1, x1 = min(top + image.shape[0], h), min(left + image.shape[1], w)
+            if y0 >= y1 or x0 >= x1:
+                continue
+            cv2.copyTo(
+                image[y0 - top:y1 - top, x0 - left:x1 - left],
+                mask[y0 - top:y1 - top, x0 - left:x1 - left],
+                frame[y0:y1, x0:x1],
+            )
@@ -0,0 +1,210 @@
+"""
+tracer.py
+---------
+Per-stage frame timing for the editor loop.
+
+Used by:
+- phase6_1_final_selection.py (AIRBLOCKS_TRACE=<path>, T / P keys)
+
+Stages of the main loop are wrapped in spans:
+
+    with tracer.span("hands.process"):
+        ...
+
+Each finished span is one event (stage, start, duration) in a
+fixed-size ring buffer, so memory stays bounded however long the
+session runs. next_frame() marks frame boundaries. summary() averages
+the most recent frames for the on-screen FPS / latency overlay, and
+dump() writes the buffer as Chrome trace-event JSON (open it in
+chrome://tracing or https://ui.perfetto.dev). draw_overlay() also takes
+extra lines, e.g. the scene writer's latency and backlog.
+
+While the tracer is disabled, span() returns a shared do-nothing
+context manager and next_frame() returns at once: nothing is timed
+or stored.
+"""
+
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+CAPACITY = 16384          # events kept (~50 s at 30 fps, ~10 spans / frame)
+FRAME = "frame"
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "stage", "start")
+
+    def __init__(self, tracer, stage):
+        self.tracer = tracer
+        self.stage = stage
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer._record(self.stage, self.start, end - self.start)
+        return False
+
+
+# ================== TRACER ==================
+
+class FrameTracer:
+    def __init__(self, enabled=False, capacity=CAPACITY):
+        self.enabled = enabled
+        self.capacity = capacity
+
+        self.stages = []          # stage id -> name
+        self._ids = {}
+        self._spans = {}          # name -> reusable _Span (spans of one name don't nest)
+
+        self.stage = np.zeros(capacity, dtype=np.int32)
+        self.start = np.zeros(capacity, dtype=np.int64)
+        self.duration = np.zeros(capacity, dtype=np.int64)
+        self.count = 0            # events recorded so far (next slot = count % capacity)
+
+        self._frame_start = None
+        self._frame_id = self._stage_id(FRAME)
+        self._tid = threading.get_ident()
+
+    def _stage_id(self, name):
+        sid = self._ids.get(name)
+        if sid is None:
+            sid = self._ids[name] = len(self.stages)
+            self.stages.append(name)
+        return sid
+
+    def _record(self, stage, start, duration):
+        i = self.count % self.capacity
+        self.stage[i] = stage
+        self.start[i] = start
+        self.duration[i] = duration
+        self.count += 1
+
+    # ---------- recording ----------
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self._frame_start = None
+
+    def span(self, name):
+        """Context manager timing one stage (a no-op while disabled)."""
+        if not self.enabled:
+            return NULL_SPAN
+        span = self._spans.get(name)
+        if span is None:
+            span = self._spans[name] = _Span(self, self._stage_id(name))
+        return span
+
+    def next_frame(self):
+        """Close the current frame span and start the next one."""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self._frame_start is not None:
+            self._record(self._frame_id, self._frame_start, now - self._frame_start)
+        self._frame_start = now
+
+    def clear(self):
+        self.count = 0
+        self._frame_start = None
+
+    # ---------- reading ----------
+
+    def events(self):
+        """(stage ids, starts ns, durations ns) in recording order."""
+        n = min(self.count, self.capacity)
+        if self.count <= self.capacity:
+            order = np.arange(n)
+        else:
+            order = (np.arange(n) + self.count) % self.capacity
+        return self.stage[order], self.start[order], self.duration[order]
+
+    def summary(self, frames=60):
+        """
+        Averages over the last `frames` frames.
+
+        :return: {"fps", "frame_ms", "stages": {name: mean ms per frame}}
+                 with stages in first-seen order; None before two frames
+        """
+        stage, start, duration = self.events()
+        frame_idx = np.flatnonzero(stage == self._frame_id)
+        if len(frame_idx) == 0:
+            return None
+
+        first = frame_idx[max(0, len(frame_idx) - frames)]
+        frame_ms = duration[frame_idx[-frames:]] / 1e6
+        window_start = start[first]
+        window_end = start[frame_idx[-1]] + duration[frame_idx[-1]]
+
+        # Stage events inside the window, summed per stage, per frame
+        inside = (start >= window_start) & (start + duration <= window_end) & (stage != self._frame_id)
+        totals = np.bincount(stage[inside], weights=duration[inside], minlength=len(self.stages))
+        mean_frame_ms = float(frame_ms.mean())
+        return {
+            "fps": 1000.0 / mean_frame_ms if mean_frame_ms > 0 else 0.0,
+            "frame_ms": mean_frame_ms,
+            "stages": {name: float(totals[sid]) / 1e6 / len(frame_ms)
+                       for sid, name in enumerate(self.stages)
+                       if sid != self._frame_id and totals[sid] > 0},
+        }
+
+    def chrome_trace(self):
+        """Buffered events as a Chrome trace-event document."""
+        stage, start, duration = self.events()
+        pid = os.getpid()
+        t0 = int(start.min()) if len(start) else 0
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": self._tid,
+                   "args": {"name": "editor loop"}}]
+        for sid, s, d in zip(stage.tolist(), start.tolist(), duration.tolist()):
+            events.append({
+                "name": self.stages[sid],
+                "cat": "frame" if sid == self._frame_id else "stage",
+                "ph": "X",
+                "ts": (s - t0) / 1e3,
+                "dur": d / 1e3,
+                "pid": pid,
+                "tid": self._tid,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+
+# ================== OVERLAY ==================
+
+def draw_overlay(frame, tracer, origin=(20, 340), color=(0, 255, 255), extra=()):
+    """FPS, frame time and per-stage milliseconds of the recent frames, then `extra` lines."""
+    summary = tracer.summary()
+    if summary is None:
+        return
+    x, y = origin
+    lines = [f"{summary['fps']:.0f} FPS  {summary['frame_ms']:.1f} ms"]
+    lines += [f"{name:<14}{ms:6.1f} ms" for name, ms in summary["stages"].items()]
+    lines += list(extra)
+    for i, line in enumerate(lines):
+        cv2.putText(frame, line, (x, y + 22 * i), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.55, color, 1)
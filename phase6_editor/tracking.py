@@ -0,0 +1,198 @@
+"""
+tracking.py
+-----------
+Skip-frame hand tracking for the gesture editor.
+
+Used by:
+- phase6_1_final_selection.py
+
+Full landmark inference (MediaPipe Hands) runs every `every` frames,
+and on every frame while the hand moves faster than `motion_limit`.
+On the frames in between, each hand's last landmarks are shifted to
+where a predictor expects its index tip to be. Gesture flags (pinch,
+fist, open hand) are translation invariant, so they carry over
+unchanged and the editor's hold timers, which run on frame time, keep
+counting correctly. A gesture change is seen at most every-1 frames late.
+
+stats exposes the inference rate and the prediction error (distance
+between predicted and measured index tip, in normalized image units,
+measured on every inference frame that follows a predicted one).
+"""
+
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from phase6_editor.gestures import INDEX_TIP, NUM_LANDMARKS
+
+
+# ================== PREDICTORS ==================
+
+class ConstantVelocityPredictor:
+    """Extrapolates the last two measurements."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.pos = None
+        self.vel = np.zeros(2)
+        self.t = None
+
+    def update(self, pos, t):
+        pos = np.asarray(pos, dtype=np.float64)
+        if self.pos is not None and t > self.t:
+            self.vel = (pos - self.pos) / (t - self.t)
+        self.pos, self.t = pos, t
+
+    def predict(self, t):
+        return self.pos + self.vel * (t - self.t)
+
+    @property
+    def speed(self):
+        return float(np.hypot(*self.vel))
+
+
+class OneEuroPredictor:
+    """
+    Extrapolates the last measurement along a One-Euro filtered velocity.
+
+    As in the One-Euro filter (Casiez et al.), the low-pass cutoff rises
+    with speed: velocity jitter is smoothed while the hand is nearly
+    still (no drifting cursor) and followed closely when it moves fast.
+    The position itself is not filtered, so predicted frames line up
+    with the inferred ones.
+    """
+
+    def __init__(self, min_cutoff=2.0, beta=10.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.reset()
+
+    def reset(self):
+        self.pos = None
+        self.vel = np.zeros(2)
+        self.t = None
+
+    def update(self, pos, t):
+        pos = np.asarray(pos, dtype=np.float64)
+        if self.pos is not None and t > self.t:
+            dt = t - self.t
+            cutoff = self.min_cutoff + self.beta * self.speed
+            alpha = 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * dt))
+            self.vel = alpha * (pos - self.pos) / dt + (1.0 - alpha) * self.vel
+        self.pos, self.t = pos, t
+
+    def predict(self, t):
+        return self.pos + self.vel * (t - self.t)
+
+    @property
+    def speed(self):
+        return float(np.hypot(*self.vel))
+
+
+PREDICTORS = {
+    "velocity": ConstantVelocityPredictor,
+    "one_euro": OneEuroPredictor,
+}
+
+
+# ================== TRACKER ==================
+
+class SkipFrameTracker:
+    def __init__(self, infer, recognizer, every=1, motion_limit=None,
+                 predictor="one_euro"):
+        """
+        :param infer: infer(frame) -> MediaPipe multi_hand_landmarks (or None)
+        :param recognizer: phase6_editor.gestures.GestureRecognizer
+        :param every: run inference every N frames (1 = every frame)
+        :param motion_limit: index-tip speed (normalized units / s) above
+                             which every frame is inferred; None = off
+        :param predictor: key of PREDICTORS
+        """
+        self.infer = infer
+        self.recognizer = recognizer
+        self.every = max(1, int(every))
+        self.motion_limit = motion_limit
+        self.predictor_factory = PREDICTORS[predictor]
+
+        self.points = np.zeros((0, NUM_LANDMARKS, 3))  # last inferred landmarks
+        self.predictors = []                 # one per hand, in landmark order
+        self.state = recognizer.process_points(self.points)
+        self._since = self.every             # frames since the last inference
+        self._predicted = False              # last frame used a prediction
+        self._recent = deque(maxlen=120)     # (t, inferred) of recent frames
+
+        self.stats = {
+            "frames": 0,
+            "inferences": 0,
+            "inference_ratio": 0.0,  # share of recent frames with inference
+            "inference_hz": 0.0,     # inferences per second, recent frames
+            "error": 0.0,            # last prediction error (normalized units)
+            "error_avg": 0.0,        # running mean of prediction errors
+            "error_max": 0.0,
+            "predictions_checked": 0,
+        }
+
+    def _due(self):
+        if self._since >= self.every:
+            return True
+        if self.motion_limit is not None:
+            return any(p.speed > self.motion_limit for p in self.predictors)
+        return False
+
+    def _observe(self, multi_hand_landmarks, t):
+        state = self.recognizer.process(multi_hand_landmarks)
+        points = np.array([hand.points for hand in state.hands]).reshape(-1, NUM_LANDMARKS, 3)
+
+        if self._predicted and len(points) and len(points) == len(self.points):
+            predicted = self._shifted(t)[:, INDEX_TIP, :2]
+            errors = np.hypot(*(predicted - points[:, INDEX_TIP, :2]).T)
+            n = self.stats["predictions_checked"] + 1
+            error = float(errors.max())
+            self.stats["error"] = error
+            self.stats["error_avg"] += (error - self.stats["error_avg"]) / n
+            self.stats["error_max"] = max(self.stats["error_max"], error)
+            self.stats["predictions_checked"] = n
+
+        if len(points) != len(self.predictors):
+            self.predictors = [self.predictor_factory() for _ in range(len(points))]
+        for predictor, hand in zip(self.predictors, points):
+            predictor.update(hand[INDEX_TIP, :2], t)
+
+        self.points = points
+        self.state = state
+        return state
+
+    def _shifted(self, t):
+        """Last landmarks moved by each hand's predicted index-tip motion."""
+        shifted = self.points.copy()
+        for i, predictor in enumerate(self.predictors):
+            shifted[i, :, :2] += predictor.predict(t) - self.points[i, INDEX_TIP, :2]
+        return shifted
+
+    def track(self, frame, t=None):
+        """Gesture state for this frame, inferred or predicted."""
+        t = time.time() if t is None else t
+        inferred = self._due()
+
+        if inferred:
+            state = self._observe(self.infer(frame), t)
+            self._since = 1
+            self._predicted = False
+            self.stats["inferences"] += 1
+        else:
+            state = self.state = self.recognizer.process_points(self._shifted(t))
+            self._since += 1
+            self._predicted = True
+
+        self.stats["frames"] += 1
+        self._recent.append((t, inferred))
+        hits = sum(1 for _, hit in self._recent if hit)
+        self.stats["inference_ratio"] = hits / len(self._recent)
+        span = self._recent[-1][0] - self._recent[0][0]
+        if span > 0:
+            self.stats["inference_hz"] = hits / span
+        return state
@@ -1,77 +1,119 @@
 """
 cube_renderer.py
 ----------------
-Low-level OpenGL cube (voxel) rendering utilities.
+Low-level OpenGL vertex batches for meshed voxel geometry.
 
 Used by:
-- phase7_viewer/viewer_3d.py
+- phase7_viewer/viewer_3d.py (vbo_supported)
+- phase7_viewer/mesh_cache.py (VertexBatch)
 
-This module draws cubes only.
+vbo_supported() tells whether the current context has vertex buffer
+objects. VertexBatch holds interleaved vertices from voxel_mesher.py,
+uploaded once into a vertex buffer and drawn with a single glDrawArrays
+call (immediate-mode fallback for contexts without buffer objects).
+Meshing itself lives in voxel_mesher.py.
 """
 
+import ctypes
+
+import numpy as np
 from OpenGL.GL import *
 
 
-# ================== CUBE GEOMETRY ==================
-
-# Cube vertices (unit cube centered at origin)
-CUBE_VERTICES = [
-    (-0.5, -0.5, -0.5),
-    ( 0.5, -0.5, -0.5),
-    ( 0.5,  0.5, -0.5),
-    (-0.5,  0.5, -0.5),
-    (-0.5, -0.5,  0.5),
-    ( 0.5, -0.5,  0.5),
-    ( 0.5,  0.5,  0.5),
-    (-0.5,  0.5,  0.5),
-]
-
-# Cube faces (indices into vertices)
-CUBE_FACES = [
-    (0, 1, 2, 3),  # back
-    (4, 5, 6, 7),  # front
-    (0, 4, 7, 3),  # left
-    (1, 5, 6, 2),  # right
-    (3, 2, 6, 7),  # top
-    (0, 1, 5, 4),  # bottom
-]
-
-# Normals for lighting
-CUBE_NORMALS = [
-    (0, 0, -1),
-    (0, 0,  1),
-    (-1, 0, 0),
-    (1, 0, 0),
-    (0, 1, 0),
-    (0, -1, 0),
-]
-
-
-# ================== DRAW FUNCTION ==================
-
-def draw_cube(position, size=1.0, color=(1.0, 1.0, 1.0)):
+# ================== BATCHED (VBO) RENDERING ==================
+
+# Interleaved vertex layout: position xyz, normal xyz, color rgb
+# (built by phase7_viewer/voxel_mesher.py)
+VERTEX_FLOATS = 9
+VERTEX_STRIDE = VERTEX_FLOATS * 4
+
+
+def vbo_supported():
+    """True if the current context can use vertex buffer objects (GL 1.5+)."""
+    try:
+        version = glGetString(GL_VERSION)
+        major, minor = (int(v) for v in version.split(b" ")[0].split(b".")[:2])
+        return (major, minor) >= (1, 5) and bool(glGenBuffers)
+    except Exception:
+        return False
+
+
+class VertexBatch:
     """
-    Draw a cube at a given position.
+    Interleaved vertices (see VERTEX_FLOATS) drawn as one primitive list.
 
-    :param position: (x, y, z)
-    :param size: cube size
-    :param color: (r, g, b) normalized (0–1) or None
+    With use_vbo the data lives in a vertex buffer; otherwise it is kept
+    in memory and replayed in immediate mode.
+    Needs a current GL context for upload() / draw() / delete().
     """
-    x, y, z = position
-
-    glPushMatrix()
-    glTranslatef(x, y, z)
-    glScalef(size, size, size)
-    
-    # MODIFIED: Check for None to support wireframe rendering (which handles its own color)
-    if color is not None:
-        glColor3f(*color)
-
-    glBegin(GL_QUADS)
-    for face, normal in zip(CUBE_FACES, CUBE_NORMALS):
-        glNormal3f(*normal)
-        for vertex_index in face:
-            glVertex3f(*CUBE_VERTICES[vertex_index])
-    glEnd()
-
-    glPopMatrix()
\ No newline at end of file
+
+    def __init__(self, mode=GL_QUADS, use_vbo=True):
+        self.mode = mode
+        self.use_vbo = use_vbo
+        self.vbo = None
+        self.data = None
+        self.count = 0
+
+    def upload(self, data):
+        data = np.ascontiguousarray(data, dtype=np.float32).reshape(-1, VERTEX_FLOATS)
+        self.count = len(data)
+
+        if not self.use_vbo:
+            self.data = data
+            return
+
+        if self.vbo is None:
+            self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self, use_color=True, ranges=None):
+        """
+        Draw the batch, or only the (first, count) vertex ranges given.
+
+        With use_color=False the current glColor is used instead of the
+        per-vertex colors (wireframe pass).
+        """
+        if self.count == 0:
+            return
+        if ranges is None:
+            ranges = [(0, self.count)]
+        if not self.use_vbo:
+            self._draw_immediate(use_color, ranges)
+            return
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glVertexPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(12))
+        if use_color:
+            glEnableClientState(GL_COLOR_ARRAY)
+            glColorPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(24))
+
+        for first, count in ranges:
+            glDrawArrays(self.mode, first, count)
+
+        if use_color:
+            glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def _draw_immediate(self, use_color, ranges):
+        glBegin(self.mode)
+        for first, count in ranges:
+            for row in self.data[first:first + count].tolist():
+                if use_color:
+                    glColor3f(*row[6:9])
+                glNormal3f(*row[3:6])
+                glVertex3f(*row[0:3])
+        glEnd()
+
+    def delete(self):
+        if self.vbo is not None:
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = None
+        self.data = None
+        self.count = 0
@@ -0,0 +1,210 @@
+"""
+mesh_cache.py
+-------------
+Per-structure GPU meshes for the 3D viewer.
+
+Used by:
+- phase7_viewer/viewer_3d.py
+
+Each structure keeps its meshed faces and wireframe edges in its own
+pair of VertexBatches, keyed by sid and tagged with the structure's
+geometry version (scene_data.structure_versions). sync() rebuilds only
+the structures whose version changed and frees the ones that are gone.
+Colors are set at draw time, so changing the active structure needs no
+rebuild at all.
+
+Inside a batch the geometry is sorted by chunk, giving a two-level
+bounding hierarchy (structure box -> chunk boxes) that is rebuilt
+together with the mesh. cull() tests it against the camera frustum;
+draws then only submit the vertex ranges of visible chunks.
+"""
+
+import numpy as np
+from OpenGL.GL import *
+
+from data import scene_data
+from phase7_viewer.cube_renderer import VertexBatch
+from phase7_viewer.voxel_mesher import (
+    mesh_structure, quad_vertices, edge_vertices, chunk_of_quads, chunk_of_edges,
+)
+from utils.math3d import boxes_in_frustum
+
+# Baked into the vertex data but overridden by the color passed to draw()
+NEUTRAL = (1.0, 1.0, 1.0)
+
+
+class ChunkGroups:
+    """Contiguous vertex ranges of one batch, one per chunk, with their boxes."""
+
+    def __init__(self, chunks, prims, verts_per_prim):
+        # prims: (P, V, 3) primitive corners, already sorted by chunk
+        if len(prims):
+            brk = np.nonzero(np.any(np.diff(chunks, axis=0) != 0, axis=1))[0] + 1
+            starts = np.r_[0, brk]
+            self.lo = np.minimum.reduceat(prims.min(axis=1), starts)
+            self.hi = np.maximum.reduceat(prims.max(axis=1), starts)
+        else:
+            starts = np.empty(0, dtype=np.intp)
+            self.lo = self.hi = np.empty((0, 3), dtype=np.float32)
+
+        ends = np.r_[starts[1:], len(prims)]
+        self.first = starts * verts_per_prim
+        self.count = (ends - starts) * verts_per_prim
+
+    def __len__(self):
+        return len(self.first)
+
+    def ranges(self, visible):
+        """Coalesced (first, count) vertex ranges of the visible chunks."""
+        idx = np.nonzero(visible)[0]
+        if len(idx) == 0:
+            return []
+        brk = np.nonzero(np.diff(idx) != 1)[0]
+        s, e = idx[np.r_[0, brk + 1]], idx[np.r_[brk, len(idx) - 1]]
+        return list(zip(self.first[s].tolist(),
+                        (self.first[e] + self.count[e] - self.first[s]).tolist()))
+
+
+def _sorted_by_chunk(chunks, *arrays):
+    order = np.lexsort((chunks[:, 1], chunks[:, 0]))
+    return (chunks[order],) + tuple(a[order] for a in arrays)
+
+
+class StructureMesh:
+    def __init__(self, use_vbo):
+        self.version = None
+        self.faces = VertexBatch(GL_QUADS, use_vbo)
+        self.edges = VertexBatch(GL_LINES, use_vbo)
+        self.face_groups = None
+        self.edge_groups = None
+        self.lo = self.hi = None      # structure box (None when empty)
+
+    def build(self, index):
+        scale = scene_data.structure_scales[index]
+        quads, normals, lines = mesh_structure(
+            scene_data.structure_cells(index),
+            scene_data.structure_heights[index],
+            scale,
+        )
+
+        chunks, quads, normals = _sorted_by_chunk(chunk_of_quads(quads, normals, scale), quads, normals)
+        self.face_groups = ChunkGroups(chunks, quads, 4)
+        self.faces.upload(quad_vertices(quads, normals, NEUTRAL))
+
+        chunks, lines = _sorted_by_chunk(chunk_of_edges(lines), lines)
+        self.edge_groups = ChunkGroups(chunks, lines, 2)
+        self.edges.upload(edge_vertices(lines, NEUTRAL))
+
+        if len(quads):
+            self.lo = self.face_groups.lo.min(axis=0)
+            self.hi = self.face_groups.hi.max(axis=0)
+        else:
+            self.lo = self.hi = None
+        self.version = scene_data.get_structure_version(index)
+
+    def delete(self):
+        self.faces.delete()
+        self.edges.delete()
+
+
+class MeshCache:
+    def __init__(self, use_vbo=True):
+        self.use_vbo = use_vbo
+        self.meshes = {}        # sid -> StructureMesh
+        self.visible = None     # sid -> (face ranges, edge ranges); None = draw all
+        self.stats = {
+            "rebuilds": 0,      # structures re-meshed since start
+            "last_rebuilds": 0, # structures re-meshed by the last sync()
+            "quads": 0,
+            "edges": 0,
+            "chunks": 0,        # chunk groups in the scene
+            "drawn": 0,         # chunk groups that passed the last cull()
+            "culled": 0,
+            "drawn_quads": 0,
+        }
+
+        # Structure boxes stacked for the first culling level
+        self._box_sids = []
+        self._box_lo = np.empty((0, 3))
+        self._box_hi = np.empty((0, 3))
+
+    def sync(self):
+        """Bring the cache in line with scene_data. Returns the number of rebuilds."""
+        rebuilt = 0
+        live = set()
+
+        for i, sid in enumerate(scene_data.structure_ids):
+            live.add(sid)
+            mesh = self.meshes.get(sid)
+            if mesh is None:
+                mesh = self.meshes[sid] = StructureMesh(self.use_vbo)
+            if mesh.version != scene_data.get_structure_version(i):
+                mesh.build(i)
+                rebuilt += 1
+
+        for sid in [sid for sid in self.meshes if sid not in live]:
+            self.meshes.pop(sid).delete()
+
+        boxed = [(sid, m) for sid, m in self.meshes.items() if m.lo is not None]
+        self._box_sids = [sid for sid, _ in boxed]
+        self._box_lo = np.array([m.lo for _, m in boxed]).reshape(-1, 3)
+        self._box_hi = np.array([m.hi for _, m in boxed]).reshape(-1, 3)
+        self.visible = None
+
+        meshes = self.meshes.values()
+        self.stats["rebuilds"] += rebuilt
+        self.stats["last_rebuilds"] = rebuilt
+        self.stats["quads"] = sum(m.faces.count for m in meshes) // 4
+        self.stats["edges"] = sum(m.edges.count for m in meshes) // 2
+        self.stats["chunks"] = sum(len(m.face_groups) for m in meshes)
+        return rebuilt
+
+    def cull(self, planes):
+        """
+        Decide what to draw for the frustum planes (utils.math3d.frustum_planes).
+
+        Structure boxes are tested first; chunk boxes only for structures
+        that may be visible.
+        """
+        self.visible = {}
+        drawn = drawn_quads = 0
+
+        inside = boxes_in_frustum(planes, self._box_lo, self._box_hi)
+        for sid, hit in zip(self._box_sids, inside.tolist()):
+            if not hit:
+                continue
+            mesh = self.meshes[sid]
+            faces = boxes_in_frustum(planes, mesh.face_groups.lo, mesh.face_groups.hi)
+            edges = boxes_in_frustum(planes, mesh.edge_groups.lo, mesh.edge_groups.hi)
+            self.visible[sid] = (mesh.face_groups.ranges(faces), mesh.edge_groups.ranges(edges))
+            drawn += int(faces.sum())
+            drawn_quads += int(mesh.face_groups.count[faces].sum()) // 4
+
+        self.stats["drawn"] = drawn
+        self.stats["culled"] = self.stats["chunks"] - drawn
+        self.stats["drawn_quads"] = drawn_quads
+
+    def _ranges(self, sid, which):
+        if self.visible is None:
+            return None     # cull() not called since the last sync(): draw all
+        hit = self.visible.get(sid)
+        return hit[which] if hit is not None else []
+
+    def draw_faces(self, sid, color):
+        mesh = self.meshes.get(sid)
+        ranges = self._ranges(sid, 0)
+        if mesh is not None and ranges != []:
+            glColor3f(*color)
+            mesh.faces.draw(use_color=False, ranges=ranges)
+
+    def draw_edges(self, sid):
+        mesh = self.meshes.get(sid)
+        ranges = self._ranges(sid, 1)
+        if mesh is not None and ranges != []:
+            mesh.edges.draw(use_color=False, ranges=ranges)
+
+    def clear(self):
+        for mesh in self.meshes.values():
+            mesh.delete()
+        self.meshes.clear()
+        self.visible = None
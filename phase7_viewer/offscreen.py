@@ -0,0 +1,326 @@
+"""
+offscreen.py
+------------
+Headless batch rendering for the 3D viewer.
+
+Used by:
+- render benchmarks and turntable previews on machines without a display:
+  python -m phase7_viewer.offscreen [scene] [--size 1280x720] [--frames 120]
+                                    [--path camera.json] [--out frames/]
+                                    [--backend egl|osmesa] [--no-png]
+
+Loads a scene snapshot, creates an offscreen OpenGL context (EGL pbuffer,
+or OSMesa software rendering) and draws every frame with
+viewer_3d.render_scene(), the same draw path display() uses. Only the
+HUD text is left out: its GLUT bitmap font needs a GLUT window.
+
+The camera follows a turntable around the scene bounds by default, or a
+JSON camera path: one {"yaw", "pitch", "distance", "focus"} object per
+frame, any key omitted falling back to the turntable value.
+
+Each frame is rendered, finished (glFinish) and read back; render and
+readback times are written with the PNG frames to timings.json. The
+first draw also builds the meshes, so it is timed on its own before the
+measured frames.
+
+A backend whose library is missing, or that cannot create a context on
+this machine, ends the run with a one-line error instead of a traceback.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+BACKENDS = ("egl", "osmesa")
+BACKEND_MODULES = {"egl": "OpenGL.EGL", "osmesa": "OpenGL.osmesa"}
+TIMINGS_FILE = "timings.json"
+
+
+# ================== CONTEXTS ==================
+
+def egl_context(width, height):
+    """Current EGL context with a width x height pbuffer; returns a release function."""
+    import ctypes
+    from OpenGL import EGL
+
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("eglInitialize failed (no EGL display)")
+
+    attrs = (EGL.EGLint * 13)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+        EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE,
+    )
+    config, count = EGL.EGLConfig(), EGL.EGLint()
+    if not EGL.eglChooseConfig(display, attrs, ctypes.pointer(config), 1, ctypes.pointer(count)) \
+            or not count.value:
+        raise RuntimeError("no EGL config with an RGB8 / depth24 pbuffer")
+
+    surface = EGL.eglCreatePbufferSurface(
+        display, config, (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE)
+    )
+    if surface == EGL.EGL_NO_SURFACE:
+        raise RuntimeError(f"cannot create a {width}x{height} EGL pbuffer")
+
+    # Desktop GL (compatibility profile): the viewer draws with fixed function
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if context == EGL.EGL_NO_CONTEXT or not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("cannot make an EGL OpenGL context current")
+
+    def release():
+        EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroyContext(display, context)
+        EGL.eglDestroySurface(display, surface)
+        EGL.eglTerminate(display)
+    return release
+
+
+def osmesa_context(width, height):
+    """Current OSMesa context rendering into host memory; returns a release function."""
+    from OpenGL import arrays, osmesa
+    from OpenGL.GL import GL_UNSIGNED_BYTE
+
+    context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+    if not context:
+        raise RuntimeError("OSMesaCreateContextExt failed")
+    buffer = arrays.GLubyteArray.zeros((height, width, 4))
+    if not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, width, height):
+        raise RuntimeError("cannot make the OSMesa context current")
+
+    def release(buffer=buffer):
+        # The default argument keeps the color buffer alive as long as the context
+        osmesa.OSMesaDestroyContext(context)
+    return release
+
+
+def select_backend(backend):
+    """
+    Point PyOpenGL at the backend; must run before OpenGL is first imported.
+
+    EGL without a display server uses Mesa's surfaceless platform.
+    """
+    if "OpenGL.GL" in sys.modules and os.environ.get("PYOPENGL_PLATFORM") != backend:
+        raise RuntimeError("OpenGL was imported before the offscreen backend was selected")
+    os.environ["PYOPENGL_PLATFORM"] = backend
+    if backend == "egl" and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+
+def load_backend(backend):
+    """
+    Select the backend and import PyOpenGL on it.
+
+    A missing EGL / OSMesa library fails inside PyOpenGL's import (often as
+    an AttributeError); it is raised as a RuntimeError naming the backend.
+    """
+    select_backend(backend)
+    try:
+        importlib.import_module("OpenGL.GL")
+        importlib.import_module(BACKEND_MODULES[backend])
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError(f"{backend} backend unavailable ({type(e).__name__}: {e})") from e
+
+
+def create_context(backend, width, height):
+    """egl_context / osmesa_context, with PyOpenGL errors raised as RuntimeError."""
+    from OpenGL import error
+
+    try:
+        return (egl_context if backend == "egl" else osmesa_context)(width, height)
+    except error.GLError as e:
+        # The full GLError text lists every ctypes argument; keep call and code
+        call = getattr(e.baseOperation, "__name__", e.baseOperation)
+        raise RuntimeError(f"cannot create an {backend} context: {call} failed ({e.err!r})") from e
+    except error.Error as e:
+        raise RuntimeError(f"cannot create an {backend} context: {e}") from e
+
+
+# ================== CAMERA PATH ==================
+
+def turntable(frames, pitch, focus, distance):
+    """One full orbit in `frames` steps."""
+    return [{"yaw": 360.0 * k / frames, "pitch": pitch, "distance": distance, "focus": focus}
+            for k in range(frames)]
+
+
+def load_camera_path(path, defaults):
+    """Camera path file merged over the turntable defaults (frame count from the file)."""
+    with open(path) as f:
+        keys = json.load(f)
+    if not isinstance(keys, list) or not keys:
+        raise ValueError(f"{path}: expected a non-empty list of camera objects")
+    return [dict(defaults[k % len(defaults)], **key) for k, key in enumerate(keys)]
+
+
+# ================== RENDERING ==================
+
+def read_frame(width, height):
+    """Color buffer as a (height, width, 3) BGR image, top row first."""
+    from OpenGL.GL import GL_BGR, GL_PACK_ALIGNMENT, GL_UNSIGNED_BYTE, glPixelStorei, glReadPixels
+
+    glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    data = glReadPixels(0, 0, width, height, GL_BGR, GL_UNSIGNED_BYTE)
+    return np.frombuffer(data, np.uint8).reshape(height, width, 3)[::-1]
+
+
+def percentiles(ms):
+    ms = np.asarray(ms)
+    if not len(ms):
+        return {}
+    return {
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def render(scene, width, height, camera_path=None, frames=120, pitch=25.0,
+           out_dir=None, backend="egl"):
+    """
+    Render a camera path offscreen.
+
+    :param scene: snapshot path (binary or JSON), None = the default snapshot
+    :param camera_path: JSON camera path file, None = turntable of `frames` frames
+    :param out_dir: directory for frame_NNNN.png + timings.json, None = no files
+    :return: timing report (also written to out_dir/timings.json)
+    :raises RuntimeError: backend library or offscreen context unavailable
+    """
+    if frames < 1:
+        raise ValueError(f"frames must be at least 1, got {frames}")
+    load_backend(backend)
+
+    from OpenGL.GL import GL_RENDERER, GL_VERSION, glFinish, glGetString
+    from data import scene_data
+    from phase7_viewer import viewer_3d
+
+    path = scene or scene_data.find_scene_file()
+    if path is None:
+        raise FileNotFoundError("no scene snapshot to render")
+    # Unreadable / invalid snapshots raise instead of rendering an empty scene
+    scene_data.load_scene_file(path)
+
+    release = create_context(backend, width, height)
+    try:
+        viewer_3d.init_gl()
+        viewer_3d.reshape(width, height)
+
+        focus, distance = viewer_3d.compute_scene_bounds()
+        cameras = turntable(frames, pitch, focus, distance)
+        if camera_path:
+            cameras = load_camera_path(camera_path, cameras)
+
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+        def place(camera):
+            viewer_3d.yaw = camera["yaw"]
+            viewer_3d.pitch = camera["pitch"]
+            viewer_3d.distance = camera["distance"]
+            viewer_3d.focus_center = tuple(camera["focus"])
+
+        # First draw builds every mesh; timed separately
+        place(cameras[0])
+        t0 = time.perf_counter()
+        viewer_3d.render_scene(hud=False)
+        glFinish()
+        first_ms = (time.perf_counter() - t0) * 1e3
+
+        per_frame = []
+        for k, camera in enumerate(cameras):
+            place(camera)
+            t0 = time.perf_counter()
+            viewer_3d.render_scene(hud=False)
+            glFinish()
+            t1 = time.perf_counter()
+            image = read_frame(width, height)
+            t2 = time.perf_counter()
+
+            entry = {"frame": k, "render_ms": (t1 - t0) * 1e3, "readback_ms": (t2 - t1) * 1e3}
+            if out_dir:
+                cv2.imwrite(os.path.join(out_dir, f"frame_{k:04d}.png"), image)
+                entry["write_ms"] = (time.perf_counter() - t2) * 1e3
+            if viewer_3d.mesh_cache is not None:
+                entry["chunks_drawn"] = viewer_3d.mesh_cache.stats["drawn"]
+            per_frame.append(entry)
+
+        summary = scene_data.scene_summary()
+        report = {
+            "scene": path,
+            "backend": backend,
+            "renderer": glGetString(GL_RENDERER).decode(errors="replace"),
+            "gl_version": glGetString(GL_VERSION).decode(errors="replace"),
+            "size": [width, height],
+            "use_vbo": viewer_3d.use_vbo,
+            "structures": summary["structures"],
+            "blocks": summary["blocks"],
+            "first_frame_ms": first_ms,
+            "render": percentiles([f["render_ms"] for f in per_frame]),
+            "readback": percentiles([f["readback_ms"] for f in per_frame]),
+            "frames": per_frame,
+        }
+    finally:
+        release()
+
+    if out_dir:
+        with open(os.path.join(out_dir, TIMINGS_FILE), "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def parse_size(text):
+    try:
+        w, h = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return w, h
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the 3D viewer offscreen.")
+    parser.add_argument("scene", nargs="?", help="scene snapshot (default: data/scene_snapshot.*)")
+    parser.add_argument("--size", type=parse_size, default=(1280, 720), help="WIDTHxHEIGHT")
+    parser.add_argument("--frames", type=int, default=120, help="turntable frames")
+    parser.add_argument("--pitch", type=float, default=25.0, help="turntable pitch (degrees)")
+    parser.add_argument("--path", help="JSON camera path (overrides the turntable)")
+    parser.add_argument("--out", default="render_frames", help="output directory")
+    parser.add_argument("--no-png", action="store_true", help="time only, write no files")
+    parser.add_argument("--backend", choices=BACKENDS,
+                        default=os.environ.get("PYOPENGL_PLATFORM")
+                        if os.environ.get("PYOPENGL_PLATFORM") in BACKENDS else "egl")
+    args = parser.parse_args(argv)
+    if args.frames < 1:
+        parser.error("--frames must be at least 1")
+
+    width, height = args.size
+    try:
+        report = render(args.scene, width, height, args.path, args.frames, args.pitch,
+                        None if args.no_png else args.out, args.backend)
+    except (OSError, ValueError, RuntimeError) as e:
+        # Unreadable scene or camera path, or no usable offscreen backend
+        sys.exit(f"offscreen: cannot render: {e}")
+
+    r = report["render"]
+    print(f"{report['renderer']} ({report['backend']}, {'VBO' if report['use_vbo'] else 'immediate'})")
+    print(f"{report['structures']} structures, {report['blocks']} blocks at {width}x{height}")
+    print(f"first frame {report['first_frame_ms']:.1f} ms (meshing)")
+    print(f"{len(report['frames'])} frames: render mean {r['mean_ms']:.2f} ms  "
+          f"p95 {r['p95_ms']:.2f} ms  max {r['max_ms']:.2f} ms  "
+          f"readback mean {report['readback']['mean_ms']:.2f} ms")
+    if not args.no_png:
+        print(f"frames and {TIMINGS_FILE} written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
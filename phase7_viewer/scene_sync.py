@@ -0,0 +1,122 @@
+"""
+scene_sync.py
+-------------
+Keeps the viewer's copy of the scene in step with the editor.
+
+Used by:
+- phase7_viewer/viewer_3d.py
+
+The editor journals every edit (data/journal.py); the viewer applies
+only the new operations. When the editor also publishes into shared
+memory (data/shm_transport.py, enabled by run_airblocks.py) new edits
+are picked up every frame without touching the disk; the journal files
+remain the fallback. Older editors without a journal fall back to
+reloading the snapshot file, but only when its mtime / size changed.
+
+Every path does nothing when nothing changed. SceneSync.stats counts
+polls, changes and full reloads, with timings, for the HUD.
+"""
+
+import os
+import time
+
+from data.journal import JournalReader
+from data.scene_data import load_scene, find_scene_file
+from data.shm_transport import SHM_ENV, ShmReader
+
+# File polling cadence (shared memory is checked every frame)
+FILE_POLL_FRAMES = 10
+
+
+class SnapshotWatcher:
+    """Reloads the snapshot file only when its content version changes."""
+
+    def __init__(self):
+        self.reloads = 0
+        self._version = None
+
+    def poll(self):
+        path = find_scene_file()
+        if path is None:
+            return 0
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 0
+
+        version = (path, st.st_mtime_ns, st.st_size)
+        if version == self._version:
+            return 0
+
+        load_scene(path)
+        self._version = version
+        self.reloads += 1
+        return 1
+
+
+class SceneSync:
+    def __init__(self, shm_name=None):
+        self.journal = JournalReader()
+        self.snapshot = SnapshotWatcher()
+        self.shm_name = shm_name or os.environ.get(SHM_ENV)
+        self.shm = None
+        self._frame = 0
+
+        self.stats = {
+            "polls": 0,
+            "changes": 0,          # polls that changed the scene
+            "reloads": 0,          # full snapshot / checkpoint loads
+            "last_ms": 0.0,        # duration of the last change
+            "total_ms": 0.0,       # time spent in polls that changed something
+            "max_ms": 0.0,
+        }
+
+    def poll(self):
+        """Bring the scene up to date. Returns True if anything changed."""
+        self._frame += 1
+        self.stats["polls"] += 1
+
+        start = time.perf_counter()
+        changed = self._poll() > 0
+        elapsed = (time.perf_counter() - start) * 1000.0
+
+        self.stats["reloads"] = self.journal.reloads + self.snapshot.reloads
+        if changed:
+            self.stats["changes"] += 1
+            self.stats["last_ms"] = elapsed
+            self.stats["total_ms"] += elapsed
+            self.stats["max_ms"] = max(self.stats["max_ms"], elapsed)
+        return changed
+
+    def _poll(self):
+        if self.shm is None and self.shm_name:
+            self.shm = ShmReader.attach(self.shm_name)
+        if self.shm is not None:
+            return self._poll_shm()
+
+        if self._frame % FILE_POLL_FRAMES:
+            return 0
+        if self.journal.available():
+            return self.journal.poll()
+        return self.snapshot.poll()
+
+    def _poll_shm(self):
+        changes = 0
+        records = self.shm.read_after(self.journal.session, self.journal.seq)
+        if records is None:
+            # Ring can't serve us (new session / overrun): resync from files
+            if self._frame % FILE_POLL_FRAMES == 0 or self.journal.session is None:
+                changes += self.journal.poll()
+            records = self.shm.read_after(self.journal.session, self.journal.seq) or []
+
+        for seq, payload in records:
+            applied = self.journal.apply_record(seq, payload)
+            if applied is None:
+                break
+            changes += applied
+        return changes
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
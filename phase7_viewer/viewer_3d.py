@@ -8,9 +8,14 @@ from OpenGL.GLU import *
 from OpenGL.GLUT import *
 
 import math
-from data.scene_data import load_scene, structures, structure_scales, structure_heights, get_active_index
-from phase7_viewer.cube_renderer import draw_cube
+from data.scene_data import structure_ids, get_active_index, scene_summary
+from phase7_viewer.cube_renderer import vbo_supported
+from phase7_viewer.mesh_cache import MeshCache
+from phase7_viewer.scene_sync import SceneSync
 from utils.colors import VOXEL_DEFAULT, VOXEL_ACTIVE, BACKGROUND
+from utils.math3d import (
+    translation_matrix, rotation_matrix, perspective_matrix, frustum_planes,
+)
 
 # ================== CAMERA STATE ==================
 yaw = 0.0
@@ -24,6 +29,15 @@ target_distance = distance
 
 CAMERA_SMOOTH = 0.15
 
+# Projection (see reshape)
+FOV_Y = 45
+Z_NEAR = 0.1
+Z_FAR = 1000
+window_size = (1000, 700)
+
+# Skip chunks outside the view frustum
+FRUSTUM_CULLING = True
+
 # CHANGE 2: Store focus target
 focus_center = (0, 0, 0)
 
@@ -34,6 +48,20 @@ right_down = False
 
 frame_count = 0
 
+# Scene updates are pulled from the editor (shared memory or journal)
+scene_sync = SceneSync()
+
+# ================== RENDER MODE ==================
+# "auto" uses vertex buffers when the context supports them,
+# "immediate" forces the immediate-mode fallback
+RENDER_MODE = os.environ.get("AIRBLOCKS_RENDER", "auto")
+
+WIRE_COLOR = (0.7, 0.9, 1.0)  # futuristic cyan-white
+
+use_vbo = False         # decided in init_gl() once a context exists
+mesh_cache = None       # per-structure meshes (MeshCache)
+meshes_dirty = True     # re-check structure versions before the next draw
+
 # ================== OPENGL INIT ==================
 def init_gl():
     glEnable(GL_DEPTH_TEST)
@@ -59,23 +87,22 @@ def init_gl():
 
     glClearColor(*(c / 255 for c in BACKGROUND), 1)
 
+    global use_vbo, mesh_cache, meshes_dirty
+    use_vbo = RENDER_MODE != "immediate" and vbo_supported()
+    mesh_cache = MeshCache(use_vbo)
+    meshes_dirty = True
+
 # CHANGE 1: Add helper to compute scene bounds
 def compute_scene_bounds():
-    if not structures:
+    # Read from the aggregates scene_data keeps per operation
+    summary = scene_summary()
+    if summary["bounds"] is None:
         return (0, 0, 0), 10
 
-    min_x = min_y = min_z = float("inf")
-    max_x = max_y = max_z = float("-inf")
+    min_x, min_z, max_x, max_z = summary["bounds"]
 
-    for i, s in enumerate(structures):
-        for level in range(structure_heights[i]):
-            for x, y in s:
-                min_x = min(min_x, x)
-                max_x = max(max_x, x)
-                min_y = min(min_y, level)
-                max_y = max(max_y, level)
-                min_z = min(min_z, y)
-                max_z = max(max_z, y)
+    min_y = 0
+    max_y = summary["max_height"] - 1
 
     cx = (min_x + max_x) / 2
     cy = (min_y + max_y) / 2
@@ -91,18 +118,15 @@ def compute_scene_bounds():
 
 # STEP 1: Add helper to compute stats
 def compute_scene_stats():
-    total_blocks = 0
-    max_height = 0
-
-    for i, s in enumerate(structures):
-        total_blocks += len(s) * structure_heights[i]
-        max_height = max(max_height, structure_heights[i])
+    summary = scene_summary()
 
     return {
-        "structures": len(structures),
-        "blocks": total_blocks,
+        "structures": summary["structures"],
+        "blocks": summary["blocks"],
         "active": get_active_index(),
-        "height": max_height
+        "height": summary["max_height"],
+        "sync": scene_sync.stats,
+        "meshes": mesh_cache.stats if mesh_cache else None,
     }
 
 # STEP 2: Add a 2D HUD draw helper
@@ -125,7 +149,16 @@ def draw_stats_hud(stats):
         f"Total Blocks : {stats['blocks']}",
         f"Active ID : {stats['active']}",
         f"Max Height : {stats['height']}",
+        f"Reloads : {stats['sync']['reloads']}  Syncs : {stats['sync']['changes']}"
+        f"  ({stats['sync']['last_ms']:.1f} ms)",
     ]
+    if stats["meshes"]:
+        lines.append(
+            f"Quads : {stats['meshes']['quads']}  Rebuilds : {stats['meshes']['rebuilds']}"
+        )
+        lines.append(
+            f"Chunks : {stats['meshes']['drawn']} drawn / {stats['meshes']['culled']} culled"
+        )
 
     y = 660
     for line in lines:
@@ -141,10 +174,51 @@ def draw_stats_hud(stats):
 
     glEnable(GL_LIGHTING)
 
+# ================== FRUSTUM ==================
+def camera_planes():
+    """Frustum planes of the current camera (matches the display() transform)."""
+    w, h = window_size
+    view = (
+        translation_matrix(0, 0, -distance)
+        @ rotation_matrix(pitch, 1, 0, 0)
+        @ rotation_matrix(yaw, 0, 1, 0)
+        @ translation_matrix(*(-c for c in focus_center))
+    )
+    proj = perspective_matrix(FOV_Y, w / max(h, 1), Z_NEAR, Z_FAR)
+    return frustum_planes(proj @ view)
+
+# ================== VOXEL DRAWING ==================
+def voxel_color(i, active):
+    return VOXEL_ACTIVE if i == active else VOXEL_DEFAULT
+
+def draw_voxels():
+    global meshes_dirty
+
+    # Only structures whose version changed are re-meshed
+    if meshes_dirty:
+        mesh_cache.sync()
+        meshes_dirty = False
+
+    if FRUSTUM_CULLING:
+        mesh_cache.cull(camera_planes())
+
+    # SOLID PASS
+    active = get_active_index()
+    for i, sid in enumerate(structure_ids):
+        mesh_cache.draw_faces(sid, voxel_color(i, active))
+
+    # WIREFRAME OVERLAY (exposed voxel edges)
+    glDisable(GL_LIGHTING)
+    glLineWidth(1.5)
+    glColor3f(*WIRE_COLOR)
+    for sid in structure_ids:
+        mesh_cache.draw_edges(sid)
+    glEnable(GL_LIGHTING)
+
 # ================== DISPLAY ==================
 def display():
     # STEP 1: FIX display() FUNCTION HEADER
-    global frame_count, focus_center, target_distance
+    global frame_count, focus_center, target_distance, meshes_dirty
     
     # STEP 3: Smooth camera every frame
     global yaw, pitch, distance
@@ -154,6 +228,24 @@ def display():
 
     frame_count += 1
 
+    # Sync first so the camera and the culling see the same focus
+    if scene_sync.poll():
+        # CHANGE 3: Update focus automatically when scene changes
+        # STEP 2: REMOVED the later global line
+        focus_center, target_distance = compute_scene_bounds()
+        meshes_dirty = True
+
+    render_scene()
+
+    glutSwapBuffers()
+
+def render_scene(hud=True):
+    """
+    Draw one frame from the current camera into the bound framebuffer.
+
+    Shared by display() and the offscreen renderer (phase7_viewer/offscreen.py),
+    which passes hud=False: the HUD text needs a GLUT window.
+    """
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
     glLoadIdentity()
 
@@ -166,47 +258,12 @@ def display():
     fx, fy, fz = focus_center
     glTranslatef(-fx, -fy, -fz)
 
-    if frame_count % 10 == 0:
-        load_scene()
-        # CHANGE 3: Update focus automatically when scene reloads
-        # STEP 2: REMOVED the later global line
-        focus_center, target_distance = compute_scene_bounds()
-
-    # STEP 1: Adjust colors at draw time (SOLID PASS)
-    active = get_active_index()
-    for i, s in enumerate(structures):
-
-        if i == active:
-            color = VOXEL_ACTIVE
-            glColor3f(1.0, 1.0, 1.0)  # full brightness
-        else:
-            color = VOXEL_DEFAULT
-            glColor3f(0.85, 0.85, 0.85)  # slightly darker
-
-        for level in range(structure_heights[i]):
-            for x, y in s:
-                draw_cube((x, level, y), structure_scales[i], color)
-
-    # STEP 3 (NEW): ===== WIREFRAME OVERLAY =====
-    glDisable(GL_LIGHTING)
-    glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
-    glLineWidth(1.5)
-
-    glColor3f(0.7, 0.9, 1.0)  # futuristic cyan-white
-    for i, s in enumerate(structures):
-        for level in range(structure_heights[i]):
-            for x, y in s:
-                draw_cube((x, level, y), structure_scales[i], None)
-
-    glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-    glEnable(GL_LIGHTING)
-    # ===========================================
+    draw_voxels()
 
     # STEP 3: Call HUD from display()
-    stats = compute_scene_stats()
-    draw_stats_hud(stats)
-
-    glutSwapBuffers()
+    if hud:
+        stats = compute_scene_stats()
+        draw_stats_hud(stats)
 
 # ================== MOUSE CONTROLS ==================
 def mouse(button, state, x, y):
@@ -259,10 +316,13 @@ def keyboard(key, x, y):
 
 # ================== WINDOW ==================
 def reshape(w, h):
+    global window_size
+    window_size = (w, h)
+
     glViewport(0, 0, w, h)
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
-    gluPerspective(45, w / max(h, 1), 0.1, 1000)
+    gluPerspective(FOV_Y, w / max(h, 1), Z_NEAR, Z_FAR)
     glMatrixMode(GL_MODELVIEW)
 
 def idle():
@@ -0,0 +1,323 @@
+"""
+voxel_mesher.py
+---------------
+Turns a structure (2D footprint extruded to a height) into the exposed
+quads and wireframe edges the viewer draws.
+
+Used by:
+- phase7_viewer/viewer_3d.py
+
+Voxel (x, level, y) is drawn as a cube of side `scale` centered at
+world (x, level, y). With scale >= 1 neighboring cubes touch or
+overlap, so faces between neighbors are hidden and coplanar exposed
+faces are merged greedily:
+
+- top / bottom : footprint split into rectangles (row runs stacked
+                 on identical runs of the next row)
+- sides        : runs of boundary cells, each spanning the full height
+
+Merging stops at chunk borders (data/voxel_store.py CHUNK_SIZE), so
+every quad covers voxels of a single chunk column and the viewer can
+cull per chunk (see chunk_of_quads / chunk_of_edges).
+
+With scale < 1 the cubes are separate and every face is emitted.
+
+The edge list keeps the per-voxel grid look of the old wireframe, but
+only on exposed faces, with shared edges removed and collinear
+touching edges joined into single segments.
+"""
+
+import numpy as np
+
+from data.voxel_store import CHUNK_SHIFT
+
+# World axes: footprint x -> 0, level -> 1, footprint y -> 2
+AXIS_X, AXIS_LEVEL, AXIS_Y = 0, 1, 2
+
+# Edge endpoints are deduplicated on a fixed grid
+QUANTUM = 1e-4
+
+EMPTY_QUADS = np.empty((0, 4, 3), dtype=np.float32)
+EMPTY_NORMALS = np.empty((0, 3), dtype=np.float32)
+EMPTY_EDGES = np.empty((0, 2, 3), dtype=np.float32)
+
+
+# ================== RUNS & RECTANGLES ==================
+
+def _runs(major, minor):
+    """
+    Split rows sorted by (major, minor) into runs of consecutive minor
+    values inside one chunk. Returns (start, end) row indices, both
+    inclusive.
+    """
+    if len(major) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    brk = np.nonzero(
+        (np.diff(major) != 0) | (np.diff(minor) != 1) | (np.diff(minor >> CHUNK_SHIFT) != 0)
+    )[0]
+    return np.r_[0, brk + 1], np.r_[brk, len(major) - 1]
+
+
+def greedy_rects(cells):
+    """
+    Cover a footprint with disjoint rectangles (none crossing a chunk border).
+
+    :param cells: (N, 2) unique int cells
+    :return: (R, 4) int64 rows of x0, x1, y0, y1 (inclusive)
+    """
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+
+    # Runs along x inside each row
+    c = cells[np.lexsort((cells[:, 0], cells[:, 1]))]
+    s, e = _runs(c[:, 1], c[:, 0])
+    x0, x1, y = c[s, 0], c[e, 0], c[s, 1]
+
+    # Stack identical runs on consecutive rows
+    order = np.lexsort((y, x1, x0))
+    x0, x1, y = x0[order], x1[order], y[order]
+    if len(y):
+        brk = np.nonzero(
+            (np.diff(x0) != 0) | (np.diff(x1) != 0) | (np.diff(y) != 1)
+            | (np.diff(y >> CHUNK_SHIFT) != 0)
+        )[0]
+        s, e = np.r_[0, brk + 1], np.r_[brk, len(y) - 1]
+    else:
+        s = e = np.empty(0, dtype=np.intp)
+
+    return np.column_stack([x0[s], x1[s], y[s], y[e]])
+
+
+def _keys(x, y):
+    return (x.astype(np.int64) << 32) | (y.astype(np.int64) & 0xFFFFFFFF)
+
+
+def _contains(sorted_keys, x, y):
+    keys = _keys(x, y)
+    pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[pos] == keys
+
+
+# ================== EXPOSED FACES ==================
+
+# Footprint directions: (dx, dy, world axis, sign)
+SIDES = (
+    (1, 0, AXIS_X, 1.0),
+    (-1, 0, AXIS_X, -1.0),
+    (0, 1, AXIS_Y, 1.0),
+    (0, -1, AXIS_Y, -1.0),
+)
+
+
+def _exposed(cells, sorted_keys, dx, dy, merged):
+    if not merged:
+        return cells
+    return cells[~_contains(sorted_keys, cells[:, 0] + dx, cells[:, 1] + dy)]
+
+
+def _voxel_centers(cells, levels):
+    """(len(cells) * len(levels), 3) world centers of cells at each level."""
+    n = len(cells)
+    out = np.empty((n * len(levels), 3), dtype=np.float64)
+    out[:, AXIS_X] = np.tile(cells[:, 0], len(levels))
+    out[:, AXIS_LEVEL] = np.repeat(levels, n)
+    out[:, AXIS_Y] = np.tile(cells[:, 1], len(levels))
+    return out
+
+
+# ================== QUADS ==================
+
+def _box_face(lo, hi, axis, sign):
+    """
+    One face of each axis-aligned box [lo, hi] (both (Q, 3)).
+    Returns (Q, 4, 3) corners.
+    """
+    u, v = [a for a in range(3) if a != axis]
+    plane = hi[:, axis] if sign > 0 else lo[:, axis]
+
+    quads = np.empty((len(lo), 4, 3), dtype=np.float32)
+    quads[:, :, axis] = plane[:, None]
+    quads[:, :, u] = np.stack([lo[:, u], hi[:, u], hi[:, u], lo[:, u]], axis=1)
+    quads[:, :, v] = np.stack([lo[:, v], lo[:, v], hi[:, v], hi[:, v]], axis=1)
+    return quads
+
+
+def _normals(count, axis, sign):
+    normals = np.zeros((count, 3), dtype=np.float32)
+    normals[:, axis] = sign
+    return normals
+
+
+def _quads(cells, sorted_keys, height, scale, merged):
+    half = scale / 2.0
+    quads, normals = [], []
+
+    def emit(lo, hi, axis, sign):
+        if len(lo):
+            quads.append(_box_face(lo, hi, axis, sign))
+            normals.append(_normals(len(lo), axis, sign))
+
+    # Top / bottom
+    if merged:
+        rects = greedy_rects(cells)
+        lo = np.column_stack([rects[:, 0], np.zeros(len(rects)), rects[:, 2]]) - half
+        hi = np.column_stack([rects[:, 1], np.full(len(rects), height - 1), rects[:, 3]]) + half
+    else:
+        centers = _voxel_centers(cells, np.arange(height))
+        lo, hi = centers - half, centers + half
+    emit(lo, hi, AXIS_LEVEL, 1.0)
+    emit(lo, hi, AXIS_LEVEL, -1.0)
+
+    # Sides
+    for dx, dy, axis, sign in SIDES:
+        side = _exposed(cells, sorted_keys, dx, dy, merged)
+        if not merged:
+            centers = _voxel_centers(side, np.arange(height))
+            emit(centers - half, centers + half, axis, sign)
+            continue
+
+        # Runs along the face direction, on the same line
+        line, along = (0, 1) if axis == AXIS_X else (1, 0)
+        side = side[np.lexsort((side[:, along], side[:, line]))]
+        s, e = _runs(side[:, line], side[:, along])
+        if len(s) == 0:
+            continue
+
+        lo = np.empty((len(s), 3))
+        hi = np.empty((len(s), 3))
+        lo[:, AXIS_LEVEL], hi[:, AXIS_LEVEL] = 0, height - 1
+        if axis == AXIS_X:
+            lo[:, AXIS_X] = hi[:, AXIS_X] = side[s, 0]
+            lo[:, AXIS_Y], hi[:, AXIS_Y] = side[s, 1], side[e, 1]
+        else:
+            lo[:, AXIS_Y] = hi[:, AXIS_Y] = side[s, 1]
+            lo[:, AXIS_X], hi[:, AXIS_X] = side[s, 0], side[e, 0]
+        emit(lo - half, hi + half, axis, sign)
+
+    if not quads:
+        return EMPTY_QUADS, EMPTY_NORMALS
+    return np.concatenate(quads), np.concatenate(normals)
+
+
+# ================== EDGES ==================
+
+def _face_edge_starts(centers, axis, sign, scale):
+    """
+    Start points (min corner) of the 4 edges of each voxel face.
+    Returns [(starts (F, 3), edge axis), ...].
+    """
+    half = scale / 2.0
+    u, v = [a for a in range(3) if a != axis]
+
+    lo = centers - half
+    lo[:, axis] = centers[:, axis] + sign * half
+
+    lo_v = lo.copy()
+    lo_v[:, v] += scale     # far edge along u
+    lo_u = lo.copy()
+    lo_u[:, u] += scale     # far edge along v
+    return [(lo, u), (lo_v, u), (lo, v), (lo_u, v)]
+
+
+def _merge_edges(starts, axis, scale):
+    """
+    Deduplicate equal-length edges along one axis and join touching ones
+    (within a chunk when the axis runs along the footprint).
+    """
+    if len(starts) == 0:
+        return EMPTY_EDGES
+
+    q = np.round(starts / QUANTUM).astype(np.int64)
+    a, b = [i for i in range(3) if i != axis]
+    q = q[np.lexsort((q[:, axis], q[:, b], q[:, a]))]
+    q = q[np.r_[True, np.any(np.diff(q, axis=0) != 0, axis=1)]]
+
+    length = int(round(scale / QUANTUM))
+    same_line = (np.diff(q[:, a]) == 0) & (np.diff(q[:, b]) == 0)
+    brk = ~same_line | (np.diff(q[:, axis]) > length)
+    if axis != AXIS_LEVEL:
+        # Unit edges start at cell - scale / 2
+        cell = np.round(q[:, axis] * QUANTUM + scale / 2.0).astype(np.int64)
+        brk |= np.diff(cell >> CHUNK_SHIFT) != 0
+    brk = np.nonzero(brk)[0]
+    s, e = np.r_[0, brk + 1], np.r_[brk, len(q) - 1]
+
+    begin = q[s].astype(np.float64) * QUANTUM
+    end = begin.copy()
+    end[:, axis] = (q[e, axis] + length) * QUANTUM
+    return np.stack([begin, end], axis=1).astype(np.float32)
+
+
+def _edges(cells, sorted_keys, height, scale, merged):
+    by_axis = {0: [], 1: [], 2: []}
+
+    def collect(centers, axis, sign):
+        for starts, edge_axis in _face_edge_starts(centers, axis, sign, scale):
+            by_axis[edge_axis].append(starts)
+
+    levels = np.arange(height)
+    top = levels[-1:] if merged else levels
+    bottom = levels[:1] if merged else levels
+    collect(_voxel_centers(cells, top), AXIS_LEVEL, 1.0)
+    collect(_voxel_centers(cells, bottom), AXIS_LEVEL, -1.0)
+
+    for dx, dy, axis, sign in SIDES:
+        side = _exposed(cells, sorted_keys, dx, dy, merged)
+        collect(_voxel_centers(side, levels), axis, sign)
+
+    edges = [_merge_edges(np.concatenate(starts), axis, scale)
+             for axis, starts in by_axis.items() if starts]
+    return np.concatenate(edges) if edges else EMPTY_EDGES
+
+
+# ================== PUBLIC ==================
+
+def mesh_structure(cells, height, scale=1.0):
+    """
+    Exposed geometry of one structure.
+
+    :param cells: (N, 2) unique footprint cells
+    :param height: number of levels
+    :param scale: cube size
+    :return: quads (Q, 4, 3), normals (Q, 3), edges (E, 2, 3), float32
+    """
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    if len(cells) == 0 or height <= 0:
+        return EMPTY_QUADS, EMPTY_NORMALS, EMPTY_EDGES
+
+    merged = scale >= 1.0
+    sorted_keys = np.sort(_keys(cells[:, 0], cells[:, 1]))
+
+    quads, normals = _quads(cells, sorted_keys, height, scale, merged)
+    edges = _edges(cells, sorted_keys, height, scale, merged)
+    return quads, normals, edges
+
+
+def chunk_of_quads(quads, normals, scale=1.0):
+    """(Q, 2) chunk coordinate (x, y) of the voxels behind each quad."""
+    inner = quads.mean(axis=1) - normals * (scale / 2.0)
+    cells = np.round(inner[:, [AXIS_X, AXIS_Y]]).astype(np.int64)
+    return cells >> CHUNK_SHIFT
+
+
+def chunk_of_edges(edges):
+    """(E, 2) chunk coordinate (x, y) of each edge midpoint."""
+    mid = edges.mean(axis=1)
+    cells = np.floor(mid[:, [AXIS_X, AXIS_Y]]).astype(np.int64)
+    return cells >> CHUNK_SHIFT
+
+
+def quad_vertices(quads, normals, color):
+    """Interleaved GL_QUADS data (position, normal, color) for a VertexBatch."""
+    out = np.empty((len(quads), 4, 9), dtype=np.float32)
+    out[:, :, 0:3] = quads
+    out[:, :, 3:6] = normals[:, None, :]
+    out[:, :, 6:9] = np.asarray(color, dtype=np.float32)
+    return out.reshape(-1, 9)
+
+
+def edge_vertices(edges, color):
+    """Interleaved GL_LINES data for a VertexBatch (normals are unused)."""
+    out = np.zeros((len(edges), 2, 9), dtype=np.float32)
+    out[:, :, 0:3] = edges
+    out[:, :, 6:9] = np.asarray(color, dtype=np.float32)
+    return out.reshape(-1, 9)
@@ -7,14 +7,18 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 editor_path = os.path.join(BASE_DIR, "phase6_1_final_selection.py")
 viewer_path = os.path.join(BASE_DIR, "phase7_viewer", "viewer_3d.py")
 
+# Shared-memory link between editor and viewer (file journal is the fallback)
+env = dict(os.environ)
+env.setdefault("AIRBLOCKS_SHM", f"airblocks_{os.getpid()}")
+
 print(" Launching AirBlocks...")
 print(" Starting Gesture Editor")
 print(" Starting 3D Viewer")
 
 # Start editor
-subprocess.Popen([sys.executable, editor_path])
+subprocess.Popen([sys.executable, editor_path], env=env)
 
 # Start viewer
-subprocess.Popen([sys.executable, viewer_path])
+subprocess.Popen([sys.executable, viewer_path], env=env)
 
 print(" AirBlocks is running")
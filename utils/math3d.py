@@ -7,11 +7,14 @@ Used by:
 - Phase 7.x OpenGL viewer
 - Future phases (rotation, physics, AR)
 
-No OpenGL or rendering code here.
+No OpenGL or rendering code here. Matrices are NumPy 4x4 arrays in
+the same convention as OpenGL (column vectors, M @ v).
 """
 
 import math
 
+import numpy as np
+
 # ================== BASIC HELPERS ==================
 
 def clamp(value, min_value, max_value):
@@ -96,3 +99,75 @@ def rotate_x(v, angle_deg):
         y * cos_a - z * sin_a,
         y * sin_a + z * cos_a,
     ]
+
+
+# ================== MATRICES ==================
+
+def translation_matrix(x, y, z):
+    """Same as glTranslatef."""
+    m = np.eye(4)
+    m[:3, 3] = (x, y, z)
+    return m
+
+
+def rotation_matrix(angle_deg, x, y, z):
+    """Same as glRotatef (axis is normalized here)."""
+    ax, ay, az = normalize([x, y, z])
+    rad = math.radians(angle_deg)
+    c, s = math.cos(rad), math.sin(rad)
+    t = 1.0 - c
+
+    m = np.eye(4)
+    m[:3, :3] = [
+        [t * ax * ax + c,      t * ax * ay - s * az, t * ax * az + s * ay],
+        [t * ax * ay + s * az, t * ay * ay + c,      t * ay * az - s * ax],
+        [t * ax * az - s * ay, t * ay * az + s * ax, t * az * az + c],
+    ]
+    return m
+
+
+def perspective_matrix(fovy_deg, aspect, near, far):
+    """Same as gluPerspective."""
+    f = 1.0 / math.tan(math.radians(fovy_deg) / 2.0)
+    m = np.zeros((4, 4))
+    m[0, 0] = f / aspect
+    m[1, 1] = f
+    m[2, 2] = (far + near) / (near - far)
+    m[2, 3] = 2.0 * far * near / (near - far)
+    m[3, 2] = -1.0
+    return m
+
+
+# ================== FRUSTUM ==================
+
+def frustum_planes(clip):
+    """
+    The 6 planes (a, b, c, d) of a projection @ view matrix, normalized,
+    with a * x + b * y + c * z + d >= 0 inside.
+    """
+    planes = np.array([
+        clip[3] + clip[0],   # left
+        clip[3] - clip[0],   # right
+        clip[3] + clip[1],   # bottom
+        clip[3] - clip[1],   # top
+        clip[3] + clip[2],   # near
+        clip[3] - clip[2],   # far
+    ])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def boxes_in_frustum(planes, lo, hi):
+    """
+    Conservative visibility of axis-aligned boxes.
+
+    :param lo, hi: (B, 3) box corners
+    :return: (B,) bool, False only for boxes fully outside one plane
+    """
+    lo = np.asarray(lo, dtype=np.float64).reshape(-1, 3)
+    hi = np.asarray(hi, dtype=np.float64).reshape(-1, 3)
+
+    # Corner furthest along each plane normal
+    positive = planes[:, :3] > 0
+    corner = np.where(positive[None, :, :], hi[:, None, :], lo[:, None, :])
+    dist = np.einsum("bpk,pk->bp", corner, planes[:, :3]) + planes[:, 3]
+    return np.all(dist >= 0, axis=1)